@@ -1,9 +1,37 @@
-from .domain import create_domain
-from .forcing import process_meteo_files, process_ocean_files, process_wave_files
+from .catalog import find_outputs
+from .config import DaskExecution, ProcessOptions, TimeResample, load_dataset_maper
+from .domain import create_domain, create_domains
+from .forcing import (
+    process_files,
+    process_meteo_files,
+    process_meteo_files_boxes,
+    process_ocean_files,
+    process_ocean_files_boxes,
+    process_wave_files,
+    process_wave_files_boxes,
+)
+from .manifest import read_manifest
+from .quicklook import quicklook
+from .verify import verify_outputs
+from .zarr_io import zarr_to_netcdf
 
 __all__ = [
+    "DaskExecution",
+    "ProcessOptions",
+    "TimeResample",
     "create_domain",
+    "create_domains",
+    "find_outputs",
+    "load_dataset_maper",
+    "process_files",
     "process_meteo_files",
+    "process_meteo_files_boxes",
     "process_ocean_files",
+    "process_ocean_files_boxes",
     "process_wave_files",
+    "process_wave_files_boxes",
+    "quicklook",
+    "read_manifest",
+    "verify_outputs",
+    "zarr_to_netcdf",
 ]
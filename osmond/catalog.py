@@ -0,0 +1,287 @@
+"""
+SQLite catalog of the processed forcing and domain files.
+
+`process` and `create_domain` index every output they write here, next to the
+manifest of its directory: kind, category and product, box, time range, grid
+spacing, packing and path. Boxes and time ranges are kept in an R*Tree, so the
+outputs covering a box and a time window are found with one query instead of
+globbing directories and opening the files.
+
+The catalog is `catalog.sqlite` in `cache_dir()`, or the file given by
+`OSMOND_CATALOG`. It is only an index: entries whose file has been removed or
+rewritten since are ignored by the queries.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import pandas as pd
+
+from .config import cache_dir
+from .manifest import output_size
+
+logger = logging.getLogger(__name__)
+
+CATALOG_NAME = "catalog.sqlite"
+
+# Errors of a catalog that cannot be opened or written, e.g. in a read-only
+# cache directory: the catalog is only an index, so they are not fatal
+CATALOG_ERRORS = (sqlite3.Error, OSError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    category TEXT,
+    product TEXT,
+    lonmin REAL NOT NULL,
+    lonmax REAL NOT NULL,
+    latmin REAL NOT NULL,
+    latmax REAL NOT NULL,
+    start TEXT,
+    end TEXT,
+    dlon REAL,
+    dlat REAL,
+    packing TEXT,
+    key TEXT,
+    source_key TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS outputs_source ON outputs (source_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS outputs_extent USING rtree(
+    id, lonmin, lonmax, latmin, latmax, tmin, tmax
+);
+"""
+
+
+class CatalogEntry(NamedTuple):
+    path: Path
+    kind: str
+    category: str | None
+    product: str | None
+    box: list[float]
+    start: str | None
+    end: str | None
+    dlon: float | None
+    dlat: float | None
+    packing: dict[str, dict[str, float]]
+    key: str | None
+    source_key: str | None
+    size: int | None
+    sha256: str | None
+    created: str
+
+
+def catalog_path() -> Path:
+    """The catalog file (`OSMOND_CATALOG`, default `catalog.sqlite` in `cache_dir()`)."""
+    path = os.environ.get("OSMOND_CATALOG")
+    return Path(path) if path else cache_dir() / CATALOG_NAME
+
+
+@contextmanager
+def connect(path: Path | None = None) -> Iterator[sqlite3.Connection]:
+    """A connection to the catalog (created if needed), committed on exit."""
+    path = path or catalog_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # concurrent writers (the workers of `process_files`) wait for the lock
+    with closing(sqlite3.connect(path, timeout=60.0)) as con:
+        con.row_factory = sqlite3.Row
+        con.executescript(SCHEMA)
+        with con:
+            yield con
+
+
+def lon_range(lonmin: float, lonmax: float) -> tuple[float, float]:
+    """Increasing longitude range of a box, unwrapping boxes across the date line."""
+    if lonmin > lonmax:
+        return lonmin, lonmax + 360.0
+    return lonmin, lonmax
+
+
+def timestamp(time: str | datetime | None, default: float) -> float:
+    """Seconds since 1970 of an ISO time (naive times are taken as UTC)."""
+    if time is None:
+        return default
+    return pd.Timestamp(time).timestamp()  # type: ignore
+
+
+def record(output: Path, entry: dict[str, Any], path: Path | None = None):
+    """
+    Index `output` in the catalog, replacing a previous entry for the same path.
+
+    `entry` holds `kind` and `box` and optionally `category`, `product`,
+    `start`/`end` (ISO times), `dlon`/`dlat`, `packing`, `key`, `source_key`,
+    `size`, `sha256` and `created`. A catalog that cannot be written is
+    logged and skipped: the outputs and their manifests are still valid.
+    """
+    lonmin, lonmax, latmin, latmax = entry["box"]
+    row = {
+        "path": str(output.resolve()),
+        "kind": entry["kind"],
+        "category": entry.get("category"),
+        "product": entry.get("product"),
+        "lonmin": lonmin,
+        "lonmax": lonmax,
+        "latmin": latmin,
+        "latmax": latmax,
+        "start": entry.get("start"),
+        "end": entry.get("end"),
+        "dlon": entry.get("dlon"),
+        "dlat": entry.get("dlat"),
+        "packing": json.dumps(entry.get("packing", {})),
+        "key": entry.get("key"),
+        "source_key": entry.get("source_key"),
+        "size": entry.get("size"),
+        "sha256": entry.get("sha256"),
+        "created": entry.get("created")
+        or datetime.now(UTC).isoformat(timespec="seconds"),
+    }
+    try:
+        with connect(path) as con:
+            old = con.execute(
+                "SELECT id FROM outputs WHERE path = ?", (row["path"],)
+            ).fetchone()
+            if old:
+                con.execute("DELETE FROM outputs WHERE id = ?", (old["id"],))
+                con.execute("DELETE FROM outputs_extent WHERE id = ?", (old["id"],))
+            columns = ", ".join(row)
+            cursor = con.execute(
+                f"INSERT INTO outputs ({columns}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values()),
+            )
+            con.execute(
+                "INSERT INTO outputs_extent VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cursor.lastrowid,
+                    *lon_range(lonmin, lonmax),
+                    latmin,
+                    latmax,
+                    timestamp(row["start"], float("-inf")),
+                    timestamp(row["end"], float("inf")),
+                ),
+            )
+    except CATALOG_ERRORS as e:
+        logger.warning("Could not index %s in the catalog: %s", output, e)
+
+
+def to_entry(row: sqlite3.Row) -> CatalogEntry:
+    return CatalogEntry(
+        path=Path(row["path"]),
+        kind=row["kind"],
+        category=row["category"],
+        product=row["product"],
+        box=[row["lonmin"], row["lonmax"], row["latmin"], row["latmax"]],
+        start=row["start"],
+        end=row["end"],
+        dlon=row["dlon"],
+        dlat=row["dlat"],
+        packing=json.loads(row["packing"] or "{}"),
+        key=row["key"],
+        source_key=row["source_key"],
+        size=row["size"],
+        sha256=row["sha256"],
+        created=row["created"],
+    )
+
+
+def is_unchanged(entry: CatalogEntry) -> bool:
+    """Whether the output of `entry` is still on disk as it was indexed."""
+    try:
+        return entry.size is None or output_size(entry.path) == entry.size
+    except OSError:
+        return False
+
+
+def box_area(entry: CatalogEntry) -> float:
+    lonmin, lonmax = lon_range(*entry.box[:2])
+    return (lonmax - lonmin) * (entry.box[3] - entry.box[2])
+
+
+def find_outputs(
+    lonlatbox: list[float],
+    start: str | datetime | None = None,
+    end: str | datetime | None = None,
+    kind: str | None = None,
+    category: str | None = None,
+    product: str | None = None,
+    resolution: float | None = None,
+    source_key: str | None = None,
+    path: Path | None = None,
+) -> list[CatalogEntry]:
+    """
+    Outputs of the catalog that cover a box and a time window.
+
+    An output matches when its box contains `lonlatbox` (`[lonmin, lonmax,
+    latmin, latmax]`, with `lonmin > lonmax` across the date line) and its
+    time range contains `start`-`end` (both optional; domains have no time
+    range and cover any window). The other arguments filter on the kind
+    (`forcing` or `domain`), the category (e.g. `ocean`), the product (e.g.
+    `copernicus`), the grid spacing (at most `resolution` degrees) and the
+    source key of the forcing (same input file and options). Outputs that
+    were removed or rewritten since they were indexed are left out.
+    Matches are sorted by area, smallest first.
+
+    Example:\n
+        >>> find_outputs([18.5, 20.0, 37.0, 38.5], "2025-01-01T06", "2025-01-01T18", category="ocean")
+    """
+    lonmin, lonmax, latmin, latmax = lonlatbox
+    qlonmin, qlonmax = lon_range(lonmin, lonmax)
+    # a missing bound of the window matches any time range
+    tmin = timestamp(start, float("inf"))
+    tmax = timestamp(end, float("-inf"))
+    filters = {
+        "kind": kind,
+        "category": category,
+        "product": product,
+        "source_key": source_key,
+    }
+    where = "".join(f" AND o.{name} = ?" for name, v in filters.items() if v)
+    params: list[Any] = [v for v in filters.values() if v]
+    if resolution is not None:
+        where += " AND MAX(o.dlon, o.dlat) <= ?"
+        params.append(resolution)
+    # boxes given in -180..180 or 0..360 longitudes
+    extents = " OR ".join(["(e.lonmin <= ? AND e.lonmax >= ?)"] * 3)
+    shifts = [-360.0, 0.0, 360.0]
+    query = (
+        "SELECT o.* FROM outputs_extent e JOIN outputs o ON o.id = e.id"
+        f" WHERE ({extents})"
+        " AND e.latmin <= ? AND e.latmax >= ?"
+        " AND e.tmin <= ? AND e.tmax >= ?"
+        f"{where}"
+    )
+    args = [v for s in shifts for v in (qlonmin + s, qlonmax + s)]
+    args += [latmin, latmax, tmin, tmax, *params]
+    with connect(path) as con:
+        rows = con.execute(query, args).fetchall()
+
+    entries: list[CatalogEntry] = []
+    for row in rows:
+        # the R*Tree rounds its bounds outwards: check the exact extent
+        elonmin, elonmax = lon_range(row["lonmin"], row["lonmax"])
+        if not any(elonmin <= qlonmin + s and qlonmax + s <= elonmax for s in shifts):
+            continue
+        if not (row["latmin"] <= latmin and latmax <= row["latmax"]):
+            continue
+        if start is not None and (
+            row["start"] is not None and timestamp(row["start"], 0.0) > tmin
+        ):
+            continue
+        if end is not None and (
+            row["end"] is not None and timestamp(row["end"], 0.0) < tmax
+        ):
+            continue
+        entry = to_entry(row)
+        if is_unchanged(entry):
+            entries.append(entry)
+    return sorted(entries, key=box_area)
@@ -0,0 +1,162 @@
+import logging
+from enum import Enum
+from typing import NamedTuple
+
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+
+class SimplifyMethod(str, Enum):
+    douglas_peucker = "douglas_peucker"
+    visvalingam = "visvalingam"
+
+
+class CoastlineSimplify(NamedTuple):
+    """
+    Options of the coastline simplification stage.
+
+    Attributes:
+        tolerance: Douglas-Peucker distance tolerance in degrees. For
+            Visvalingam-Whyatt, vertices whose effective triangle area is below
+            `tolerance**2` are removed.
+        min_area: Features with a smaller area (in square degrees) are dropped.
+        drop_holes: Drop features enclosed by two or more other features
+            (e.g. lakes on islands), which can not be reached from the sea.
+        method: The line simplification algorithm.
+    """
+
+    tolerance: float = 0.0
+    min_area: float = 0.0
+    drop_holes: bool = False
+    method: SimplifyMethod = SimplifyMethod.douglas_peucker
+
+
+class SimplifyStats(NamedTuple):
+    features_in: int
+    features_out: int
+    vertices_in: int
+    vertices_out: int
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of the vertices removed."""
+        if self.vertices_in == 0:
+            return 0.0
+        return 1.0 - self.vertices_out / self.vertices_in
+
+
+def to_polygons(rings: list[np.ndarray]) -> np.ndarray:
+    """Build one shapely Polygon per closed ring, in a single vectorized call."""
+    indices = np.repeat(np.arange(len(rings)), [len(r) for r in rings])
+    linearrings = shapely.linearrings(np.concatenate(rings), indices=indices)  # type: ignore
+    return shapely.polygons(linearrings)  # type: ignore
+
+
+def exterior_rings(polygons: np.ndarray) -> list[np.ndarray]:
+    """Coordinates of the exterior ring of each polygon."""
+    coords, index = shapely.get_coordinates(  # type: ignore
+        shapely.get_exterior_ring(polygons),  # type: ignore
+        return_index=True,
+    )
+    counts = np.bincount(index, minlength=len(polygons))  # type: ignore
+    return np.split(coords, np.cumsum(counts)[:-1])  # type: ignore
+
+
+def nesting_depth(polygons: np.ndarray) -> np.ndarray:
+    """Number of other polygons enclosing each polygon."""
+    valid = shapely.make_valid(polygons)  # type: ignore
+    tree = shapely.STRtree(valid)  # type: ignore
+    inner, outer = tree.query(valid, predicate="within")  # type: ignore
+    inner = inner[inner != outer]  # type: ignore
+    return np.bincount(inner, minlength=len(polygons))  # type: ignore
+
+
+def visvalingam(rings: list[np.ndarray], min_triangle_area: float) -> list[np.ndarray]:
+    """
+    Visvalingam-Whyatt simplification of closed rings, vectorized over all rings.
+
+    Each round removes, in every ring at once, the vertices whose effective
+    triangle area is below `min_triangle_area` and is a local minimum among
+    their neighbours, until no vertex qualifies. Rings keep at least three
+    distinct vertices.
+    """
+    # work on open rings concatenated in one array
+    counts = np.array([len(r) - 1 for r in rings])
+    coords = np.concatenate([r[:-1] for r in rings])
+    ring_id = np.repeat(np.arange(len(rings)), counts)
+    while True:
+        starts = np.cumsum(counts) - counts
+        idx = np.arange(len(coords))
+        first = starts[ring_id]
+        last = first + counts[ring_id] - 1
+        prev = np.where(idx == first, last, idx - 1)
+        nxt = np.where(idx == last, first, idx + 1)
+        area = 0.5 * np.abs(
+            (coords[prev, 0] - coords[:, 0]) * (coords[nxt, 1] - coords[:, 1])
+            - (coords[nxt, 0] - coords[:, 0]) * (coords[prev, 1] - coords[:, 1])
+        )
+        remove = (area < min_triangle_area) & (area <= area[prev]) & (area < area[nxt])
+        nremove = np.bincount(ring_id[remove], minlength=len(rings))
+        remove &= (counts - nremove >= 3)[ring_id]
+        if not remove.any():
+            break
+        coords, ring_id = coords[~remove], ring_id[~remove]
+        counts = np.bincount(ring_id, minlength=len(rings))
+    return [
+        np.concatenate([ring, ring[:1]])
+        for ring in np.split(coords, np.cumsum(counts)[:-1])
+    ]
+
+
+def simplify_polygons(
+    rings: list[np.ndarray],
+    options: CoastlineSimplify,
+) -> tuple[list[np.ndarray], SimplifyStats]:
+    """
+    Simplify closed coastline rings and drop small or unreachable features.
+
+    Returns the simplified rings and the feature and vertex counts before and
+    after simplification.
+    """
+    vertices_in = sum(len(r) for r in rings)
+    if not rings:
+        return rings, SimplifyStats(0, 0, 0, 0)
+
+    polygons = to_polygons(rings)
+    keep = np.ones(len(rings), dtype=bool)
+    if options.min_area > 0.0:
+        keep &= shapely.area(polygons) >= options.min_area  # type: ignore
+    if options.drop_holes:
+        keep &= nesting_depth(polygons) < 2
+    polygons = polygons[keep]
+
+    if options.tolerance > 0.0:
+        if options.method == SimplifyMethod.visvalingam:
+            kept = [ring for ring, k in zip(rings, keep) if k]
+            out = visvalingam(kept, options.tolerance**2) if kept else []
+        else:
+            polygons = shapely.simplify(  # type: ignore
+                polygons, options.tolerance, preserve_topology=True
+            )
+            polygons = polygons[~shapely.is_empty(polygons)]  # type: ignore
+            out = exterior_rings(polygons) if len(polygons) else []
+    else:
+        out = [ring for ring, k in zip(rings, keep) if k]
+
+    stats = SimplifyStats(
+        features_in=len(rings),
+        features_out=len(out),
+        vertices_in=vertices_in,
+        vertices_out=sum(len(r) for r in out),
+    )
+    logger.info(
+        "Coastline simplified: %d -> %d features, %d -> %d vertices (%.1f%% reduction)",
+        stats.features_in,
+        stats.features_out,
+        stats.vertices_in,
+        stats.vertices_out,
+        100 * stats.reduction,
+    )
+    return out, stats
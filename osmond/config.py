@@ -1,10 +1,18 @@
+import hashlib
+import os
+import pickle
+from collections.abc import Callable, Sequence
 from enum import Enum
 from pathlib import Path
 from types import MappingProxyType
-from typing import NamedTuple, Self, TypeAlias
+from typing import IO, Any, NamedTuple, Self, TypeAlias
 
+import pydantic
 import yaml
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from .derived import expression_names, parse_expression
+from .medslik_io import read_bath_header
 
 
 class ModelBase(BaseModel):
@@ -135,16 +143,147 @@ class DepthMaping(ModelBase):
     output_levels: list[float]
 
 
+class DerivedVar(ModelBase):
+    """A field computed from the data variables, see `osmond.derived`."""
+
+    expr: str
+    standard_name: str
+    long_name: str
+    units: str
+
+    @field_validator("expr")
+    @classmethod
+    def check_expr(cls, expr: str) -> str:
+        parse_expression(expr)
+        return expr
+
+    def field_attr(self) -> FieldAttr:
+        return FieldAttr(self.standard_name, self.long_name, self.units)
+
+
 class DataSetMap(BaseModel):
     data_vars: dict[str, DataVarMap]
     coords: dict[str, DataVarMap]
     depth_mapping: DepthMaping | None = None
+    # Derived variables available for this product (the category-wide ones
+    # of the registry's `derived` section are merged in)
+    derived: dict[str, DerivedVar] = {}
+    # Global attributes identifying the product (each value is looked for,
+    # ignoring case, in the attribute of the file), used by product detection
+    # to tell apart products with the same variables
+    match_attrs: dict[str, str] = {}
+
+
+class ResampleMethod(str, Enum):
+    decimate = "decimate"
+    mean = "mean"
+    linear = "linear"
+
+
+class TimeResample(ModelBase):
+    """
+    Resampling of the time axis to a target interval.
+
+    Attributes:
+        interval: Target interval in hours.
+        method: `decimate` keeps the input steps falling on the target
+            interval (the input must have every one of them), `mean`
+            averages blocks of input steps (labelled at the block centre)
+            and `linear` interpolates linearly in time.
+
+    Each input file is resampled on its own: the target axis starts at the
+    first step of the file, blocks and interpolation do not reach into the
+    neighbouring files, and a file with a single step is left unchanged.
+    """
+
+    interval: float = Field(gt=0.0)
+    method: ResampleMethod = ResampleMethod.mean
+
+
+class OutputFormat(str, Enum):
+    netcdf = "netcdf"
+    zarr = "zarr"
+
+
+class Precision(str, Enum):
+    native = "native"
+    float32 = "float32"
+
+
+class TargetGrid(ModelBase):
+    """Regular lon/lat grid, given by its first/last points and sizes like a `.bath` header."""
+
+    lon1: float
+    lon2: float
+    lat1: float
+    lat2: float
+    nlon: int = Field(gt=0)
+    nlat: int = Field(gt=0)
+
+    @classmethod
+    def from_bath(cls, path: str | Path) -> "TargetGrid":
+        """The grid of a Medslik `.bath` file, e.g. one written by `create_domain`."""
+        header = read_bath_header(Path(path))
+        return cls(
+            lon1=header.lon1,
+            lon2=header.lon2,
+            lat1=header.lat1,
+            lat2=header.lat2,
+            nlon=header.nlon,
+            nlat=header.nlat,
+        )
+
+
+class ProcessOptions(ModelBase):
+    """Optional stages of the forcing pipeline, all disabled by default."""
+
+    time_resample: TimeResample | None = None
+    target_grid: TargetGrid | None = None
+    # Extrapolate valid values this many cells into missing (land) areas
+    fill_cells: int = Field(default=0, ge=0)
+    # Skip outputs that the manifest records as made from the same inputs and settings
+    skip_unchanged: bool = False
+    # `float32` decodes the inputs to float32 and keeps every stage in float32;
+    # `native` computes in the dtype xarray decodes the inputs to
+    precision: Precision = Precision.native
+    # Derived variables (e.g. `wind10`) to add to the outputs
+    derived: list[str] = []
+    # `zarr` writes `<name>.zarr` directory stores instead of `<name>.nc` files,
+    # see `osmond.zarr_io.zarr_to_netcdf` for the conversion
+    output_format: OutputFormat = OutputFormat.netcdf
+    # Cut the output from a catalogued output of the same input file and settings
+    # whose box covers it, instead of processing the input again
+    reuse: bool = False
+
+
+class Scheduler(str, Enum):
+    threads = "threads"
+    processes = "processes"
+    local_cluster = "local_cluster"
+
+
+class DaskExecution(ModelBase):
+    """
+    Run a batch as one lazy dask task graph on a local scheduler.
+
+    Attributes:
+        scheduler: `threads`, `processes` or `local_cluster` (a
+            `dask.distributed.LocalCluster`, needs the `distributed` package).
+        num_workers: Number of worker threads/processes (dask default if unset).
+        time_chunk: Time steps per chunk; every chunk holds the whole box.
+    """
+
+    scheduler: Scheduler = Scheduler.threads
+    num_workers: int | None = Field(default=None, gt=0)
+    time_chunk: int = Field(default=24, gt=0)
 
 
 class DataSetMaper(BaseModel):
     meteo: dict[str, DataSetMap] = {}
     ocean: dict[str, DataSetMap] = {}
     waves: dict[str, DataSetMap] = {}
+    # Derived variables of every product of a category
+    derived: dict[str, dict[str, DerivedVar]] = {}
 
     @model_validator(mode="after")
     def check_coords_and_data_vars(self) -> Self:
@@ -162,12 +301,119 @@ class DataSetMaper(BaseModel):
                     )
         return self
 
+    @model_validator(mode="after")
+    def merge_derived(self) -> Self:
+        if unknown := self.derived.keys() - {"meteo", "ocean", "waves"}:
+            raise ValueError(f"Unknown categories of derived variables: {unknown}")
+        for category in ("meteo", "ocean", "waves"):
+            for dsname, dsmap in getattr(self, category).items():
+                dsmap.derived = {**self.derived.get(category, {}), **dsmap.derived}
+                if clash := dsmap.derived.keys() & dsmap.data_vars.keys():
+                    raise ValueError(
+                        f"Derived variables of dataset {dsname} shadow data variables: {clash}"
+                    )
+                for name, dvar in dsmap.derived.items():
+                    names = dsmap.data_vars.keys() | dsmap.derived.keys()
+                    if unknown := expression_names(dvar.expr) - names:
+                        raise ValueError(
+                            f"Derived variable {name} of dataset {dsname} uses unknown variables {unknown}"
+                        )
+        return self
+
+    def get(self, category: str, product: str) -> DataSetMap:
+        products: dict[str, DataSetMap] = getattr(self, category)
+        if product not in products:
+            raise ValueError(
+                f"Unknown {category} product {product!r}, "
+                f"available: {', '.join(products) or 'none'}"
+            )
+        return products[product]
+
+
+default_config_yml = Path(__file__).parent / "config.yml"  # type: ignore
+
+
+def cache_dir() -> Path:
+    """Directory for osmond's on-disk caches (`OSMOND_CACHE_DIR`, default `~/.cache/osmond`)."""
+    return Path(os.environ.get("OSMOND_CACHE_DIR", Path.home() / ".cache" / "osmond"))
+
+
+def write_cache(path: Path, write: Callable[[IO[bytes]], Any]) -> bool:
+    """
+    Write a cache file with `write(f)`, returning whether it could be written.
+
+    The file is written next to `path` and moved in place, so concurrent
+    readers never see it half written. Caches are an optimisation only: a
+    file that cannot be written (e.g. on a read-only home) is skipped.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            write(f)
+        tmp.replace(path)
+    except OSError:
+        return False
+    return True
+
+
+def config_files(paths: Sequence[str | Path]) -> list[Path]:
+    """Expand directories in `paths` to the YAML files they contain."""
+    files: list[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted([*path.glob("*.yml"), *path.glob("*.yaml")])
+        else:
+            files.append(path)
+    return files
+
+
+def env_config_paths() -> list[str]:
+    """Extra product registries listed in `OSMOND_CONFIG_PATH` (os.pathsep separated)."""
+    return [p for p in os.environ.get("OSMOND_CONFIG_PATH", "").split(os.pathsep) if p]
+
+
+def parse_dataset_maper(files: list[Path]) -> DataSetMaper:
+    """Merge the product mappings of `files` (later files win) and validate them."""
+    config: dict[str, dict[str, Any]] = {}
+    for file in files:
+        with file.open("r") as f:
+            for category, products in (yaml.safe_load(f) or {}).items():
+                if category == "derived":
+                    # merged per variable, not per category
+                    for dcategory, dvars in (products or {}).items():
+                        config.setdefault(category, {}).setdefault(
+                            dcategory, {}
+                        ).update(dvars or {})
+                    continue
+                config.setdefault(category, {}).update(products or {})
+    return DataSetMaper(**config)
+
+
+def load_dataset_maper(paths: Sequence[str | Path] = ()) -> DataSetMaper:
+    """
+    Load the bundled product mappings extended with the YAML files or directories in `paths`.
+
+    The validated registry is pickled in `cache_dir()` under a key built from
+    the content of every file, the validator modules and the pydantic version,
+    so later loads of the same files skip YAML parsing and validation.
+    """
+    files = [default_config_yml, *config_files([*env_config_paths(), *paths])]
+    key = hashlib.sha256(pydantic.VERSION.encode())
+    for file in [Path(__file__), Path(__file__).with_name("derived.py"), *files]:
+        key.update(file.read_bytes())
+    cached = cache_dir() / f"registry-{key.hexdigest()[:32]}.pkl"
+    if cached.exists():
+        try:
+            with cached.open("rb") as f:
+                return pickle.load(f)
+        except Exception:  # noqa: BLE001
+            # stale (e.g. pickled by other versions) or corrupt artifact,
+            # rebuilt below: a bad cache must not break `import osmond`
+            cached.unlink(missing_ok=True)
 
-def load_dataset_maper() -> DataSetMaper:
-    default_config_yml = Path(__file__).parent / "config.yml"  # type: ignore
-    with default_config_yml.open("r") as f:
-        config = yaml.safe_load(f)
-    data_set_map = DataSetMaper(**config)
+    data_set_map = parse_dataset_maper(files)
+    write_cache(cached, lambda f: pickle.dump(data_set_map, f))
     return data_set_map
 
 
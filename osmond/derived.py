@@ -0,0 +1,158 @@
+"""
+Expressions of derived forcing fields.
+
+A derived variable is an arithmetic expression of the (unit converted) data
+variables of a product and of other derived variables, e.g.
+`hypot(x_wind10, y_wind10)`. Expressions are parsed with `ast` and only
+numbers, names, `+ - * / ** %` and the functions of `FUNCTIONS` are allowed.
+They are evaluated with NumPy ufuncs on the xarray variables, so they are
+vectorised, keep the float32 dtype of the data and stay lazy on dask arrays.
+Rotations of vector components are written with `sin`/`cos`, e.g.
+`x_wind10 * cos(radians(30)) - y_wind10 * sin(radians(30))`.
+"""
+
+import ast
+import operator
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import numpy as np
+import xarray as xr
+
+FUNCTIONS: dict[str, Callable[..., Any]] = {
+    "abs": np.abs,
+    "arctan2": np.arctan2,
+    "cos": np.cos,
+    "degrees": np.degrees,
+    "exp": np.exp,
+    "hypot": np.hypot,
+    "log": np.log,
+    "maximum": np.maximum,
+    "minimum": np.minimum,
+    "mod": np.mod,
+    "radians": np.radians,
+    "sin": np.sin,
+    "sqrt": np.sqrt,
+    "tan": np.tan,
+}
+
+CONSTANTS = {"pi": np.pi}
+
+BINARY_OPS: dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+
+UNARY_OPS: dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+
+def check_node(node: ast.AST):
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in BINARY_OPS:
+            raise ValueError(f"Operator {type(node.op).__name__} is not allowed")
+        check_node(node.left)
+        check_node(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in UNARY_OPS:
+            raise ValueError(f"Operator {type(node.op).__name__} is not allowed")
+        check_node(node.operand)
+    elif isinstance(node, ast.Call):
+        func = node.func.id if isinstance(node.func, ast.Name) else None
+        if func not in FUNCTIONS:
+            raise ValueError(f"Unknown function in {ast.unparse(node)!r}")
+        if node.keywords:
+            raise ValueError(
+                f"Keyword arguments are not allowed: {ast.unparse(node)!r}"
+            )
+        for arg in node.args:
+            check_node(arg)
+    elif isinstance(node, ast.Constant):
+        if type(node.value) not in (int, float):
+            raise ValueError(f"Only numeric constants are allowed: {node.value!r}")
+    elif type(node) is not ast.Name:
+        raise ValueError(f"Unsupported expression {ast.unparse(node)!r}")
+
+
+def parse_expression(expr: str) -> ast.expr:
+    """Parse and check `expr`, raising ValueError if it is not allowed."""
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {expr!r}: {e.msg}") from None
+    check_node(tree.body)
+    if not variable_names(tree.body):
+        raise ValueError(f"Expression {expr!r} does not use any variable")
+    return tree.body
+
+
+def variable_names(node: ast.expr) -> set[str]:
+    return {
+        name.id
+        for name in ast.walk(node)
+        if isinstance(name, ast.Name)
+        and name.id not in FUNCTIONS
+        and name.id not in CONSTANTS
+    }
+
+
+def expression_names(expr: str) -> set[str]:
+    """Variables used by `expr`."""
+    return variable_names(parse_expression(expr))
+
+
+def evaluate(node: ast.expr, namespace: Mapping[str, Any]) -> Any:
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPS[type(node.op)](
+            evaluate(node.left, namespace), evaluate(node.right, namespace)
+        )
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPS[type(node.op)](evaluate(node.operand, namespace))
+    if isinstance(node, ast.Call):
+        func = FUNCTIONS[node.func.id]  # type: ignore
+        return func(*(evaluate(arg, namespace) for arg in node.args))
+    if isinstance(node, ast.Constant):
+        return node.value
+    name = node.id  # type: ignore
+    if name in CONSTANTS:
+        return CONSTANTS[name]
+    return namespace[name]
+
+
+def evaluate_derived(
+    ds: xr.Dataset,
+    expressions: Mapping[str, str],
+    names: list[str],
+) -> dict[str, xr.DataArray]:
+    """
+    Evaluate the derived variables `names` on the data variables of `ds`.
+
+    `expressions` maps every derived variable to its expression; derived
+    variables used by others are evaluated first (once), but only `names`
+    are returned.
+    """
+    values: dict[str, xr.DataArray] = {}
+
+    def value(name: str, stack: tuple[str, ...]) -> xr.DataArray:
+        if name in values:
+            return values[name]
+        if name in ds.data_vars:
+            return ds[name]
+        if name not in expressions:
+            raise ValueError(f"Unknown variable {name!r} in derived expressions")
+        if name in stack:
+            raise ValueError(
+                f"Circular derived variables: {' -> '.join((*stack, name))}"
+            )
+        expr = expressions[name]
+        namespace = {dep: value(dep, (*stack, name)) for dep in expression_names(expr)}
+        values[name] = evaluate(parse_expression(expr), namespace).rename(name)
+        return values[name]
+
+    return {name: value(name, ()) for name in names}
@@ -0,0 +1,181 @@
+import hashlib
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+import cf_xarray  # type: ignore  # noqa: F401
+import xarray as xr
+
+from .config import (
+    DataSetMap,
+    DataSetMaper,
+    DataSetType,
+    data_maper,
+    meteo_dataset,
+    ocean_dataset,
+    waves_dataset,
+)
+
+dataset_types: dict[str, DataSetType] = {
+    "meteo": meteo_dataset,
+    "ocean": ocean_dataset,
+    "waves": waves_dataset,
+}
+
+# CF standard names used by common products for the osmond fields
+STANDARD_NAME_ALIASES: dict[str, tuple[str, ...]] = {
+    "air_pressure_at_sea_level": ("air_pressure_at_mean_sea_level",),
+    "x_wind": ("eastward_wind",),
+    "y_wind": ("northward_wind",),
+    "sea_water_x_velocity": ("eastward_sea_water_velocity",),
+    "sea_water_y_velocity": ("northward_sea_water_velocity",),
+    "sea_surface_wave_zero_upcrossing_period": (
+        "sea_surface_wave_mean_period_from_variance_spectral_density_second_frequency_moment",
+    ),
+}
+
+# cf_xarray axis of each osmond coordinate
+COORD_AXES = {"longitude": "X", "latitude": "Y", "depth": "Z", "time": "T"}
+
+# Global attributes that identify a product, used in the fingerprint
+PRODUCT_ATTRS = ("source", "institution", "title", "product_id", "product", "model")
+
+
+class Detection(NamedTuple):
+    category: str
+    product: str
+    # Product mapping with the names resolved against the detected file
+    dset_map: DataSetMap
+
+
+_detections: dict[str, Detection] = {}
+
+
+def fingerprint(ds: xr.Dataset, attrs: Iterable[str] = PRODUCT_ATTRS) -> str:
+    """Hash of the grid, variable names/metadata and product attributes of `ds`."""
+    key = hashlib.sha256()
+    for name in sorted(map(str, ds.variables)):
+        var = ds.variables[name]
+        key.update(repr((name, var.dims, var.attrs.get("standard_name"))).encode())
+    for name in sorted(map(str, ds.dims)):
+        if (
+            name in ds.coords
+            and ds[name].ndim == 1
+            and ds[name].size
+            and name != "time"
+        ):
+            values = ds[name].values
+            key.update(repr((name, ds.sizes[name], values[0], values[-1])).encode())
+    for attr in attrs:
+        key.update(repr((attr, ds.attrs.get(attr))).encode())
+    return key.hexdigest()
+
+
+def attrs_match(ds: xr.Dataset, dset_map: DataSetMap) -> bool:
+    """Whether the global attributes of `ds` hold the `match_attrs` of `dset_map`."""
+    return all(
+        value.lower() in str(ds.attrs.get(attr, "")).lower()
+        for attr, value in dset_map.match_attrs.items()
+    )
+
+
+def resolve_map(
+    ds: xr.Dataset,
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+) -> tuple[DataSetMap, int] | None:
+    """
+    Resolve the source names of `dset_map` against `ds`.
+
+    Names that are not in `ds` are looked up by CF standard name (data
+    variables) or CF axis (coordinates). Returns the resolved mapping and the
+    number of names matched exactly, or None if a field can not be found.
+    """
+    standard_names = ds.cf.standard_names
+    axes = ds.cf.axes
+    exact = 0
+    data_vars = {}
+    for fname, dfield in dset_map.data_vars.items():
+        if dfield.name in ds.variables:
+            exact += 1
+            data_vars[fname] = dfield
+            continue
+        target = dset_type["data_vars"][fname].standard_name
+        candidates = [
+            var
+            for sname in (target, *STANDARD_NAME_ALIASES.get(target, ()))
+            for var in standard_names.get(sname, [])
+        ]
+        if len(candidates) != 1:
+            return None
+        data_vars[fname] = dfield.model_copy(update={"name": candidates[0]})
+    coords = {}
+    for fname, dfield in dset_map.coords.items():
+        if dfield.name in ds.variables:
+            exact += 1
+            coords[fname] = dfield
+            continue
+        candidates = axes.get(COORD_AXES.get(fname, ""), [])
+        if len(candidates) != 1:
+            return None
+        coords[fname] = dfield.model_copy(update={"name": candidates[0]})
+    resolved = dset_map.model_copy(update={"data_vars": data_vars, "coords": coords})
+    return resolved, exact
+
+
+def detect_product(
+    ds: xr.Dataset,
+    dataset_maper: DataSetMaper | None = None,
+) -> Detection:
+    """
+    Pick the registry product mapping matching `ds`.
+
+    Every product of every category whose `match_attrs` are found in the
+    global attributes is resolved against the file; the one with the most
+    exactly matching names wins, and among those the one matching the most
+    global attributes. The choice is cached per fingerprint of the file (grid,
+    variables and product attributes).
+    """
+    maper = dataset_maper or data_maper
+    registry = hashlib.sha256(maper.model_dump_json().encode()).hexdigest()
+    products = [
+        (category, product, dset_map)
+        for category in dataset_types
+        for product, dset_map in getattr(maper, category).items()
+    ]
+    attrs = {attr for *_, dset_map in products for attr in dset_map.match_attrs}
+    key = f"{registry}-{fingerprint(ds, sorted({*PRODUCT_ATTRS, *attrs}))}"
+    if key in _detections:
+        return _detections[key]
+
+    best: tuple[tuple[int, int], Detection] | None = None
+    ambiguous = False
+    for category, product, dset_map in products:
+        if not attrs_match(ds, dset_map):
+            continue
+        match = resolve_map(ds, dset_map, dataset_types[category])
+        if match is None:
+            continue
+        resolved, exact = match
+        score = (exact, len(dset_map.match_attrs))
+        if best is None or score > best[0]:
+            best = (score, Detection(category, product, resolved))
+            ambiguous = False
+        elif score == best[0]:
+            ambiguous = True
+    if best is None:
+        raise ValueError("No product mapping matches the dataset")
+    if ambiguous:
+        raise ValueError(
+            f"Several product mappings match the dataset as well as {best[1].product!r}"
+        )
+    _detections[key] = best[1]
+    return best[1]
+
+
+def detect_file(
+    path: str | Path, dataset_maper: DataSetMaper | None = None
+) -> Detection:
+    """`detect_product` on the metadata of a NetCDF file."""
+    with xr.open_dataset(path, decode_times=False, chunks={}) as ds:  # type: ignore
+        return detect_product(ds, dataset_maper)
@@ -1,13 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
+from time import perf_counter
+from typing import Any
 
 import cartopy.io.shapereader as shpreader  # type: ignore
 import geopandas as gpd  # type: ignore
 import matplotlib.pyplot as plt
 import numpy as np
+import shapely
 import xarray as xr
 from shapely.geometry import Polygon
 
+from .catalog import record as catalog_record
+from .coastline import CoastlineSimplify, SimplifyStats, simplify_polygons, to_polygons
+from .manifest import input_record, run_key, update_manifest
+from .medslik_io import LAND_DEPTH, read_bath_header, write_bath, write_map
+from .quicklook import PYRAMID_SUFFIX, write_pyramid
+
 
 class CoastLineScale(str, Enum):
     f = "fine"
@@ -17,30 +27,139 @@ class CoastLineScale(str, Enum):
     c = "coarse"
 
 
-def write_bathy(bathy: xr.DataArray, path: Path, name: str = ""):
-    with path.open("w") as f:
-        title = " Bathymetry"
-        if name:
-            title = f"{title} of {name}"
-        f.write(f"{title}\n")
-        # lon1 lon2 lat1 lat2 in Fortran XX4(xF10.6)
-        lon1 = bathy["lon"].values[0]  # type: ignore
-        lon2 = bathy["lon"].values[-1]  # type: ignore
-        lat1 = bathy["lat"].values[0]  # type: ignore
-        lat2 = bathy["lat"].values[-1]  # type: ignore
-        f.write(f"    {lon1:.6f}  {lon2:.6f}  {lat1:.6f}  {lat2:.6f}\n")
-
-        # nlon nlat in Fortran XX2(xF10.6)
-        nlat = bathy.shape[0]
-        nlon = bathy.shape[1]
-        f.write(f"    {nlon}  {nlat}\n")
-
-        # invert bathy values and clip to 9000
-        bathy_values = -1 * bathy.values  # type: ignore
-        bathy_values[bathy_values > 9000] = 9000  # type: ignore
-        bathy_values[bathy_values <= 0] = 9999.0  # type: ignore
-        bathy_values = np.flip(bathy_values, axis=0)
-        np.savetxt(f, bathy_values, fmt="%5.0f", delimiter="")  # type: ignore
+class CoarsenMethod(str, Enum):
+    mean = "mean"
+    min_depth = "min_depth"
+
+
+# Catalog category of the domain files
+DOMAIN_CATEGORIES = {".bath": "bathymetry", ".map": "coastline", ".npz": "pyramid"}
+
+
+def coarsen_bathy(
+    bathy: xr.DataArray,
+    resolution: float,
+    method: CoarsenMethod = CoarsenMethod.mean,
+) -> xr.DataArray:
+    """
+    Coarsen `bathy` by block aggregation to (about) `resolution` degrees.
+
+    The blocks are `round(resolution / native resolution)` cells wide and are
+    aggregated lazily, chunk by chunk, so a dask backed slice is never loaded
+    at full resolution. `mean` averages the elevation of each block, while
+    `min_depth` keeps its shallowest value (so any land in a block stays land).
+    A slice less than two cells wide or high is returned as is.
+    """
+    if min(bathy.sizes["lat"], bathy.sizes["lon"]) < 2:
+        # no grid spacing to coarsen from
+        return bathy
+    native = abs(float(bathy["lon"][1] - bathy["lon"][0]))  # type: ignore
+    factor = max(1, round(resolution / native))
+    if factor == 1:
+        return bathy
+    blocks = bathy.coarsen(lat=factor, lon=factor, boundary="trim")  # type: ignore
+    if method == CoarsenMethod.min_depth:
+        return blocks.max()  # type: ignore
+    return blocks.mean()  # type: ignore
+
+
+def write_bathy(
+    bathy: xr.DataArray, path: Path, name: str = "", pyramid: Path | None = None
+) -> dict[Path, str]:
+    """
+    Write the `.bath` file of an elevation grid, and its overview `pyramid` if
+    given, returning the sha256 of each written file.
+    """
+    title = "Bathymetry"
+    if name:
+        title = f"{title} of {name}"
+    lon1 = bathy["lon"].values[0]  # type: ignore
+    lon2 = bathy["lon"].values[-1]  # type: ignore
+    lat1 = bathy["lat"].values[0]  # type: ignore
+    lat2 = bathy["lat"].values[-1]  # type: ignore
+
+    # invert bathy values and clip to 9000
+    bathy_values = -1 * bathy.values  # type: ignore
+    bathy_values[bathy_values > 9000] = 9000  # type: ignore
+    bathy_values[bathy_values <= 0] = LAND_DEPTH  # type: ignore
+    checksums = {
+        path: write_bath(path, bathy_values, lon1, lon2, lat1, lat2, title)  # type: ignore
+    }
+    if pyramid:
+        checksums[pyramid] = write_pyramid(
+            pyramid,
+            bathy_values,  # type: ignore
+            lon1,  # type: ignore
+            lon2,  # type: ignore
+            lat1,  # type: ignore
+            lat2,  # type: ignore
+        )
+    return checksums
+
+
+def record_domain(
+    outputs: dict[Path, str],
+    bathymetry: str,
+    box: list[float],
+    settings: dict[str, Any],
+    timings: dict[str, float],
+    simplify_stats: SimplifyStats | None = None,
+):
+    """
+    Add the written `.bath`/`.map` files (with their checksums) to the manifest and the catalog.
+
+    The coastline simplification counts, if any, are kept in the `.map` entry.
+    """
+    inputs = [input_record(bathymetry)]
+    key = run_key(inputs, box=box, **settings)
+    spacing = {}
+    for output in outputs:
+        if output.suffix == ".bath":
+            header = read_bath_header(output)
+            spacing = {
+                "dlon": (header.lon2 - header.lon1) / max(header.nlon - 1, 1),
+                "dlat": (header.lat2 - header.lat1) / max(header.nlat - 1, 1),
+            }
+    for output, checksum in outputs.items():
+        size = output.stat().st_size
+        entry = {
+            "kind": "domain",
+            "key": key,
+            "inputs": inputs,
+            "box": box,
+            "settings": settings,
+            "sha256": checksum,
+            "size": size,
+            "timings": timings,
+        }
+        if simplify_stats and output.suffix == ".map":
+            entry["simplify_stats"] = simplify_stats._asdict()
+        update_manifest(output, entry)
+        catalog_record(
+            output,
+            {
+                "kind": "domain",
+                "category": DOMAIN_CATEGORIES.get(output.suffix),
+                "product": Path(bathymetry).stem,
+                "box": box,
+                **spacing,
+                "key": key,
+                "size": size,
+                "sha256": checksum,
+            },
+        )
+
+
+def domain_settings(
+    resolution: float | None,
+    coarsen_method: CoarsenMethod,
+    simplify: CoastlineSimplify | None,
+) -> dict[str, Any]:
+    return {
+        "resolution": resolution,
+        "coarsen_method": coarsen_method.value,
+        "simplify": simplify._asdict() if simplify else None,
+    }
 
 
 def subset_shapefile(  # type: ignore
@@ -64,8 +183,9 @@ def subset_shapefile(  # type: ignore
     return clipped_shp  # type: ignore
 
 
-def process_coastline_from_bathy(bathy: xr.DataArray, output: Path):
-    lon, lat, val = bathy["lon"], bathy["lat"], bathy.values[:, :]  # type: ignore
+def extract_coastline_polygons(bathy: xr.DataArray) -> list[np.ndarray]:
+    """Closed zero-elevation contours of `bathy`, with the domain edges taken as land."""
+    lon, lat, val = bathy["lon"], bathy["lat"], np.array(bathy.values)  # type: ignore
     val[0, :] = 1.0
     val[-1, :] = 1.0
     val[:, 0] = 1.0
@@ -74,22 +194,50 @@ def process_coastline_from_bathy(bathy: xr.DataArray, output: Path):
     contour = plt.contour(lon, lat, val, levels=[0])  # type: ignore
     plt.axis("off")  # type: ignore
 
-    geometries = []
+    geometries: list[np.ndarray] = []
     for path in contour.get_paths():
         for coordinates in path.to_polygons():
             geometries.append(coordinates)  # type: ignore
+    return geometries
+
+
+def clip_polygons(
+    polygons: list[np.ndarray],
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+) -> list[np.ndarray]:
+    """Clip coastline rings to a box, returning the rings of the clipped polygons."""
+    if not polygons:
+        return []
+    clipped = shapely.intersection(  # type: ignore
+        shapely.make_valid(to_polygons(polygons)),  # type: ignore
+        shapely.box(lonmin, latmin, lonmax, latmax),  # type: ignore
+    )
+    parts = shapely.get_parts(shapely.get_parts(clipped))  # type: ignore
+    parts = parts[  # type: ignore
+        (shapely.get_type_id(parts) == 3) & ~shapely.is_empty(parts)  # type: ignore
+    ]  # Polygons only
+    geometries: list[np.ndarray] = []
+    for part in parts:  # type: ignore
+        geometries.append(np.asarray(part.exterior.coords))  # type: ignore
+        for interior in part.interiors:  # type: ignore
+            geometries.append(np.asarray(interior.coords))  # type: ignore
+    return geometries
 
-    nfeatures = len(geometries)  # type: ignore
-    flines = [f"{nfeatures}\n"]
-    for geom in geometries:  # type: ignore
-        feature_len = len(geom)  # type: ignore
-        flines.append(f"{feature_len}  0\n")
-        for g in geom:  # type: ignore
-            flines.append(f"{g[0]:10.5f} {g[1]:10.5f}\n")
 
-    with output.open("w") as f:
-        for line in flines:
-            f.write(line)
+def process_coastline_from_bathy(
+    bathy: xr.DataArray,
+    output: Path,
+    simplify: CoastlineSimplify | None = None,
+) -> tuple[str, SimplifyStats | None]:
+    """Write the coastline of `bathy`, returning the file checksum and simplification stats."""
+    geometries = extract_coastline_polygons(bathy)
+    stats = None
+    if simplify:
+        geometries, stats = simplify_polygons(geometries, simplify)
+    return write_map(output, geometries), stats
 
 
 def process_coastline(
@@ -102,30 +250,16 @@ def process_coastline(
 ):
     shpfilename: str = shpreader.gshhs(scale=coastline_scale.name, level=1)  # type: ignore
     subset_shp = subset_shapefile(shpfilename, lonmin, lonmax, latmin, latmax)  # type: ignore
-    nfeatures = subset_shp.shape[0]  # type: ignore
-    path = output
 
-    flines = [""]
-    nfeatures = 0
+    geometries: list[np.ndarray] = []
     for _, row in subset_shp.iterrows():  # type: ignore
         if row.geometry.geom_type == "Polygon":  # type: ignore
-            nfeatures += 1
-            feature_len = len(row.geometry.exterior.coords)  # type: ignore
-            flines.append(f"{feature_len}  0\n")
-            for g in row.geometry.exterior.coords:  # type: ignore
-                flines.append(f"{g[0]:10.5f} {g[1]:10.5f}\n")
+            geometries.append(np.asarray(row.geometry.exterior.coords))  # type: ignore
         else:
             for geo in row.geometry.geoms:  # type: ignore
-                nfeatures += 1
-                feature_len = len(geo.exterior.coords)  # type: ignore
-                flines.append(f"{feature_len}  0\n")
-                for g in geo.exterior.coords:  # type: ignore
-                    flines.append(f"{g[0]:10.5f} {g[1]:10.5f}\n")
+                geometries.append(np.asarray(geo.exterior.coords))  # type: ignore
 
-    flines[0] = f"{nfeatures}\n"
-    with path.open("w") as f:
-        for line in flines:
-            f.write(line)
+    write_map(output, geometries)
 
 
 def create_domain(
@@ -136,6 +270,10 @@ def create_domain(
     latmax: float,
     output: str = "./output",
     coastline_scale: CoastLineScale = CoastLineScale.f,
+    resolution: float | None = None,
+    coarsen_method: CoarsenMethod = CoarsenMethod.mean,
+    simplify: CoastlineSimplify | None = None,
+    pyramid: bool = False,
 ) -> tuple[Path, Path]:
     """
     Creates a Medslik bathymetry and coastline file from a GEBCO netCDF file and GSHHS shapefile.
@@ -160,6 +298,23 @@ def create_domain(
             - `i` (intermediate)
             - `l` (low)
             - `c` (coarse)
+        resolution (float, optional):
+            Target grid spacing in degrees. When given, the GEBCO bathymetry is
+            coarsened by block aggregation before writing, and the coastline is
+            extracted from the coarsened grid. Defaults to the native resolution.
+        coarsen_method (CoarsenMethod, optional):
+            How blocks are aggregated when coarsening. Options are:\n\n
+            - `mean` (block-averaged elevation)
+            - `min_depth` (shallowest elevation of the block)
+        simplify (CoastlineSimplify, optional):
+            Simplify the coastline before writing it (line simplification
+            tolerance, minimum feature area, dropping of holes). The feature
+            and vertex counts before and after are logged and recorded in the
+            manifest entry of the `.map` file. By default every contour vertex
+            is written.
+        pyramid (bool, optional):
+            Also write a downsampled overview pyramid of the bathymetry
+            (`<output>.pyramid.npz`), used by `quicklook` to preview the domain.
 
     Returns:
             A tuple containing the path to the generated Medslik bathymetry file (`<output>.bath`) and coastline file (`<output>.map`).
@@ -175,13 +330,162 @@ def create_domain(
         >>> create_domain(bathymetry, lonmin, lonmax, latmin, latmax, output, coastline_scale)
 
     """
+    start = perf_counter()
     bathy = xr.open_dataset(bathymetry, chunks={})["elevation"]  # type: ignore
     bds = bathy.loc[latmin:latmax, lonmin:lonmax]  # type: ignore
+    if resolution:
+        bds = coarsen_bathy(bds, resolution, coarsen_method)  # type: ignore
+    # read (and coarsen) once, for both the bathymetry and the coastline
+    bds = bds.load()  # type: ignore
     output_path = Path(output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_bathy = output_path.with_suffix(".bath")
     output_map = output_path.with_suffix(".map")
-    write_bathy(bds, output_bathy)  # type: ignore
-    process_coastline_from_bathy(bds, output_map)  # type: ignore
+    output_pyramid = output_path.with_suffix(PYRAMID_SUFFIX) if pyramid else None
+    checksums = write_bathy(bds, output_bathy, pyramid=output_pyramid)  # type: ignore
+    map_checksum, stats = process_coastline_from_bathy(bds, output_map, simplify)  # type: ignore
     # process_coastline(output_map, coastline_scale, lonmin, lonmax, latmin, latmax)
+    record_domain(
+        {**checksums, output_map: map_checksum},
+        bathymetry,
+        [lonmin, lonmax, latmin, latmax],
+        domain_settings(resolution, coarsen_method, simplify),
+        {"total": perf_counter() - start},
+        stats,
+    )
     return output_bathy, output_map
+
+
+def box_clusters(boxes: list[list[float]]) -> list[list[int]]:
+    """Group the indices of `boxes` into clusters of (transitively) overlapping boxes."""
+    parent = list(range(len(boxes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i, (lonmin, lonmax, latmin, latmax) in enumerate(boxes):
+        for j in range(i):
+            blonmin, blonmax, blatmin, blatmax = boxes[j]
+            if (
+                lonmin <= blonmax
+                and blonmin <= lonmax
+                and latmin <= blatmax
+                and blatmin <= latmax
+            ):
+                parent[find(i)] = find(j)
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(len(boxes)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def create_domains(
+    bathymetry: str,
+    boxes: list[list[float]],
+    outputs: list[str],
+    max_workers: int | None = None,
+    resolution: float | None = None,
+    coarsen_method: CoarsenMethod = CoarsenMethod.mean,
+    simplify: CoastlineSimplify | None = None,
+    pyramid: bool = False,
+) -> list[tuple[Path, Path]]:
+    """
+    Creates Medslik bathymetry and coastline files for several domains from a single read of the GEBCO file.
+
+    Overlapping boxes are grouped together: the bathymetry covering each group
+    is read once and its coastline is extracted once, then the bathymetry is cut
+    and the coastline polygons are clipped for every box of the group. The
+    per-box outputs are written in parallel.
+
+    Args:
+        bathymetry (str):
+            Path to the GEBCO netCDF bathymetry file.
+        boxes (list[list[float]]):
+            The domains, each given as `[lonmin, lonmax, latmin, latmax]`.
+        outputs (list[str]):
+            Path for the output files of each domain (same length as `boxes`).
+        max_workers (int, optional):
+            Maximum number of domains written concurrently.
+        resolution (float, optional):
+            Target grid spacing in degrees, see `create_domain`. The union
+            region of each group is coarsened once, so nested domains share
+            the same grid.
+        coarsen_method (CoarsenMethod, optional):
+            How blocks are aggregated when coarsening, see `create_domain`.
+        simplify (CoastlineSimplify, optional):
+            Simplify each clipped coastline before writing it, see `create_domain`.
+        pyramid (bool, optional):
+            Also write the overview pyramid of each bathymetry, see `create_domain`.
+
+    Returns:
+            A list with, for each box, a tuple containing the path to the generated Medslik bathymetry file (`<output>.bath`) and coastline file (`<output>.map`).
+
+    Example:\n
+        >>> bathymetry = "/path/to/GEBCO_bathymetry.nc"
+        >>> boxes = [[-10.0, 10.0, -5.0, 5.0], [-2.0, 2.0, -1.0, 1.0]]
+        >>> outputs = ["./workdir/outer", "./workdir/inner"]
+        >>> create_domains(bathymetry, boxes, outputs)
+
+    """
+    if len(boxes) != len(outputs):
+        raise ValueError("boxes and outputs must have the same length")
+    bathy = xr.open_dataset(bathymetry, chunks={})["elevation"]  # type: ignore
+    ret: list[tuple[Path, Path]] = [(Path(), Path())] * len(boxes)
+
+    settings = domain_settings(resolution, coarsen_method, simplify)
+
+    def write_domain(
+        block: xr.DataArray, polygons: list[np.ndarray], i: int, read_time: float
+    ):
+        start = perf_counter()
+        lonmin, lonmax, latmin, latmax = boxes[i]
+        output_path = Path(outputs[i])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_bathy = output_path.with_suffix(".bath")
+        output_map = output_path.with_suffix(".map")
+        checksums = write_bathy(
+            block.loc[latmin:latmax, lonmin:lonmax],  # type: ignore
+            output_bathy,
+            pyramid=output_path.with_suffix(PYRAMID_SUFFIX) if pyramid else None,
+        )
+        geometries = clip_polygons(polygons, lonmin, lonmax, latmin, latmax)
+        stats = None
+        if simplify:
+            geometries, stats = simplify_polygons(geometries, simplify)
+        map_checksum = write_map(output_map, geometries)
+        record_domain(
+            {**checksums, output_map: map_checksum},
+            bathymetry,
+            list(boxes[i]),
+            settings,
+            # the read and contouring are shared by the boxes of a cluster
+            {"read": read_time, "write": perf_counter() - start},
+            stats,
+        )
+        ret[i] = (output_bathy, output_map)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for cluster in box_clusters(boxes):
+            lonmin = min(boxes[i][0] for i in cluster)
+            lonmax = max(boxes[i][1] for i in cluster)
+            latmin = min(boxes[i][2] for i in cluster)
+            latmax = max(boxes[i][3] for i in cluster)
+            start = perf_counter()
+            block = bathy.loc[latmin:latmax, lonmin:lonmax]  # type: ignore
+            if resolution:
+                block = coarsen_bathy(block, resolution, coarsen_method)  # type: ignore
+            block = block.load()  # type: ignore
+            # contouring goes through pyplot, which is not thread safe
+            polygons = extract_coastline_polygons(block)  # type: ignore
+            read_time = perf_counter() - start
+            for i in cluster:
+                futures.append(  # type: ignore
+                    executor.submit(write_domain, block, polygons, i, read_time)
+                )
+        for future in futures:  # type: ignore
+            future.result()  # type: ignore
+    return ret
@@ -0,0 +1,92 @@
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+import xarray as xr
+
+GRID_DIMS = ("latitude", "longitude")
+
+# Orthogonal neighbours first, so they win over diagonal ones
+NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FillMap(NamedTuple):
+    # flat (lat * lon) indices of the cells to fill
+    target: np.ndarray
+    # flat index of the valid cell each target cell copies
+    source: np.ndarray
+
+
+_fill_maps: dict[str, FillMap] = {}
+
+
+def fill_index_map(valid: np.ndarray, max_cells: int) -> FillMap:
+    """
+    Nearest valid cell of every missing cell within `max_cells` cells of a valid one.
+
+    Grows the valid region by one cell (8-neighbourhood) per iteration, each
+    new cell taking the source of a neighbour, for all cells at once.
+    """
+    nlat, nlon = valid.shape
+    source = np.where(valid, np.arange(valid.size).reshape(valid.shape), -1)
+    for _ in range(max_cells):
+        missing = source < 0
+        if not missing.any():
+            break
+        padded = np.pad(source, 1, constant_values=-1)
+        candidate = np.full_like(source, -1)
+        for dy, dx in NEIGHBOURS:
+            neighbour = padded[1 + dy : 1 + dy + nlat, 1 + dx : 1 + dx + nlon]
+            take = (candidate < 0) & (neighbour >= 0)
+            candidate[take] = neighbour[take]
+        grown = missing & (candidate >= 0)
+        if not grown.any():
+            break
+        source[grown] = candidate[grown]
+    filled = (source >= 0) & ~valid
+    return FillMap(np.flatnonzero(filled), source[filled])
+
+
+def get_fill_map(valid: np.ndarray, max_cells: int) -> FillMap:
+    """`fill_index_map`, cached per land-sea mask."""
+    key = hashlib.sha256(np.packbits(valid).tobytes())
+    key.update(repr((valid.shape, max_cells)).encode())
+    name = key.hexdigest()
+    if name not in _fill_maps:
+        _fill_maps[name] = fill_index_map(valid, max_cells)
+    return _fill_maps[name]
+
+
+def apply_fill(data: np.ndarray, fill_map: FillMap) -> np.ndarray:
+    """Fill the last two (lat, lon) axes of `data`, for all leading slices at once."""
+    flat = data.reshape(*data.shape[:-2], -1).copy()
+    flat[..., fill_map.target] = flat[..., fill_map.source]
+    return flat.reshape(data.shape)
+
+
+def fill_coastal(ds: xr.Dataset, max_cells: int) -> xr.Dataset:
+    """
+    Extrapolate the data variables of `ds` up to `max_cells` cells into missing areas.
+
+    The land-sea mask of each variable is taken from its first time (and
+    depth) slice; variables sharing a mask share one fill map.
+    """
+    filled: dict[str, xr.DataArray] = {}
+    for vname, da in ds.data_vars.items():
+        first = da.isel({dim: 0 for dim in da.dims if dim not in GRID_DIMS})
+        valid = ~np.isnan(first.transpose(*GRID_DIMS).values)  # type: ignore
+        fill_map = get_fill_map(valid, max_cells)
+        if fill_map.target.size == 0:
+            filled[str(vname)] = da
+            continue
+        filled[str(vname)] = xr.apply_ufunc(
+            apply_fill,
+            da.chunk({dim: -1 for dim in GRID_DIMS}) if da.chunks else da,
+            kwargs={"fill_map": fill_map},
+            input_core_dims=[list(GRID_DIMS)],
+            output_core_dims=[list(GRID_DIMS)],
+            dask="parallelized",
+            output_dtypes=[da.dtype],
+            keep_attrs=True,
+        )
+    return xr.Dataset(filled, attrs=ds.attrs)
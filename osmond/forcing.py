@@ -1,22 +1,64 @@
+import logging
+import multiprocessing
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from time import perf_counter
+from typing import Any
 
 import cf_xarray  # type: ignore
+import dask.config
 import numpy as np
 import pandas as pd
 import xarray as xr
+from dask.base import compute
+from dask.delayed import delayed
 from xarray.coding.times import decode_cf_datetime  # type: ignore
 
+from .catalog import CATALOG_ERRORS, CatalogEntry, find_outputs, lon_range
+from .catalog import record as catalog_record
 from .config import (
+    DaskExecution,
     DataSetMap,
+    DataSetMaper,
     DataSetType,
-    MeteoMap,
-    OceanMap,
-    WaveMap,
+    FieldAttr,
+    OutputFormat,
+    Precision,
+    ProcessOptions,
+    ResampleMethod,
+    Scheduler,
+    TimeResample,
     data_maper,
     meteo_dataset,
     ocean_dataset,
     waves_dataset,
 )
+from .derived import evaluate_derived
+from .detect import Detection, dataset_types, detect_file
+from .fill import fill_coastal
+from .manifest import (
+    file_sha256,
+    input_record,
+    is_current,
+    output_size,
+    packing_record,
+    run_key,
+    time_record,
+    update_manifest,
+    write_netcdf,
+)
+from .regrid import regrid_dataset
+from .zarr_io import restore_attr_types, write_zarr
+
+logger = logging.getLogger(__name__)
+
+# Options that do not change the content of an output
+RUN_EXCLUDE = {"skip_unchanged", "reuse"}
+
+# Degrees of slack when cutting outputs, whose coordinates are float32
+CUT_TOLERANCE = 1e-4
 
 
 def subset(
@@ -41,21 +83,129 @@ def subset(
         return lat_subset.sel({lon_name: slice(lonmin, lonmax)})  # type: ignore
 
 
-def process(
+def box_positions(
+    darray: xr.DataArray,
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+) -> dict[str, slice]:
+    """Positional slices along X and Y covering what `subset` selects for a box."""
+    lon_name = darray.cf.axes["X"][0]
+    lat_name = darray.cf.axes["Y"][0]
+    lon_index = darray.indexes[lon_name]
+    lat_index = darray.indexes[lat_name]
+    if lonmin > lonmax:
+        lon_slice = slice(
+            lon_index.slice_indexer(None, lonmax).start,
+            lon_index.slice_indexer(lonmin, None).stop,
+        )
+    else:
+        lon_slice = lon_index.slice_indexer(lonmin, lonmax)
+    return {
+        lon_name: lon_slice,
+        lat_name: lat_index.slice_indexer(latmin, latmax),
+    }
+
+
+def pad_box(darray: xr.DataArray, lonlatbox: list[float]) -> list[float]:
+    """Widen a box by one grid cell of `darray` on every side."""
+    lonmin, lonmax, latmin, latmax = lonlatbox
+    lon = darray[darray.cf.axes["X"][0]].values  # type: ignore
+    lat = darray[darray.cf.axes["Y"][0]].values  # type: ignore
+    dlon = abs(float(lon[1] - lon[0])) if lon.size > 1 else 0.0
+    dlat = abs(float(lat[1] - lat[0])) if lat.size > 1 else 0.0
+    return [lonmin - dlon, lonmax + dlon, latmin - dlat, latmax + dlat]
+
+
+def union_hyperslab(
+    darray: xr.DataArray,
+    lonlatboxes: list[list[float]],
+) -> dict[str, slice]:
+    """Smallest positional hyperslab of `darray` that contains every box."""
+    union: dict[str, slice] = {}
+    for lonlatbox in lonlatboxes:
+        for dim, pos in box_positions(darray, *lonlatbox).items():
+            if dim in union:
+                pos = slice(
+                    min(pos.start, union[dim].start), max(pos.stop, union[dim].stop)
+                )
+            union[dim] = pos
+    return union
+
+
+def decode_float32(da: xr.DataArray) -> xr.DataArray:
+    """Mask and unpack a raw (undecoded) variable directly to float32."""
+    attrs = dict(da.attrs)
+    scale = attrs.pop("scale_factor", None)
+    offset = attrs.pop("add_offset", None)
+    fills = [
+        value
+        for name in ("_FillValue", "missing_value")
+        if name in attrs
+        for value in np.atleast_1d(attrs.pop(name)).tolist()
+    ]
+    out = da.astype(np.float32)
+    if fills:
+        out = out.where(~da.isin(fills))
+    if scale is not None:
+        out = out * np.float32(scale)
+    if offset is not None:
+        out = out + np.float32(offset)
+    out.attrs = attrs
+    return out
+
+
+def as_float32(ds: xr.Dataset) -> xr.Dataset:
+    """Cast the floating point data variables of `ds` to float32."""
+    return ds.assign(
+        {
+            vname: da.astype(np.float32)
+            for vname, da in ds.data_vars.items()
+            if da.dtype.kind == "f" and da.dtype != np.float32
+        }
+    )
+
+
+def open_mapped(
     input: Path,
-    lonlatbox: list[float],
-    output: Path,
     dset_map: DataSetMap,
-    dset_type: DataSetType,
-):
-    ds = xr.open_dataset(input, chunks={}, decode_times=False)  # type: ignore
-    lonmin, lonmax, latmin, latmax = lonlatbox
+    precision: Precision = Precision.native,
+) -> xr.Dataset:
+    """
+    Open an input file lazily with variables renamed to the osmond names.
+
+    With `float32` precision the data variables are decoded to float32 from
+    their raw (e.g. packed int16) values, instead of through xarray's
+    decoding, which unpacks to float64 when the packing attributes are float64.
+    """
+    ds = xr.open_dataset(  # type: ignore
+        input,
+        chunks={},
+        decode_times=False,
+        mask_and_scale=precision == Precision.native,
+    )
     fieldname_map = {dfield.name: fname for fname, dfield in dset_map.data_vars.items()}
     ds = ds.rename_vars(fieldname_map)[list(fieldname_map.values())]
-    coordname_map = {dfield.name: fname for fname, dfield in dset_map.coords.items()}
-    ds = ds.rename_vars(coordname_map)
+    if precision == Precision.float32:
+        ds = ds.assign({fname: decode_float32(ds[fname]) for fname in ds.data_vars})
+    coordname_map = {
+        dfield.name: fname
+        for fname, dfield in dset_map.coords.items()
+        if dfield.name != fname
+    }
+    # coordinates matched by CF axis (e.g. `lon`) name their dimension too
+    return ds.rename(coordname_map)
+
+
+def subset_dataset(
+    ds: xr.Dataset,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+) -> xr.Dataset:
+    lonmin, lonmax, latmin, latmax = lonlatbox
     subset_vars: dict[str, xr.DataArray] = {}
-    for vname in fieldname_map.values():
+    for vname in dset_map.data_vars:
         subset_vars[vname] = subset(ds[vname], lonmin, lonmax, latmin, latmax)
 
         if dset_map.depth_mapping:
@@ -67,19 +217,128 @@ def process(
                 ],
                 dim="depth",
             )
+    return xr.Dataset(subset_vars)
 
-    ds = xr.Dataset(subset_vars)
-    ds.load()  # type: ignore
+
+# Hours in one unit of the time axis
+UNIT_HOURS = {"seconds": 1 / 3600, "minutes": 1 / 60, "hours": 1.0, "days": 24.0}
+
+
+def resample_time(ds: xr.Dataset, resample: TimeResample) -> xr.Dataset:
+    """
+    Resample the (undecoded) time axis of `ds` to `resample.interval` hours.
+
+    Works on the lazy dataset, so decimation only reads the kept steps and
+    block means and interpolation are evaluated chunk by chunk. `ds` is one
+    input file: the target axis starts at its first step, and a dataset with
+    a single step is returned unchanged.
+    """
+    time = ds["time"]
+    if time.size < 2:
+        return ds
+    units_interval = time.attrs["units"].lower().split()[0].strip()
+    interval = resample.interval / UNIT_HOURS[units_interval]
+    values = time.values.astype(np.float64)  # type: ignore
+    offsets = (values - values[0]) / interval
+
+    if resample.method == ResampleMethod.decimate:
+        keep = np.isclose(offsets, np.round(offsets), rtol=0.0, atol=1e-6)
+        # every step of the target axis must be an input step
+        if np.count_nonzero(keep) != np.floor(offsets[-1] + 1e-6) + 1:
+            raise ValueError(
+                "Decimation needs a time axis with a step dividing "
+                f"{resample.interval:g} hours"
+            )
+        return ds.isel(time=np.flatnonzero(keep))
+
+    if resample.method == ResampleMethod.mean:
+        steps = np.diff(values)
+        factor = interval / steps[0] if steps.size else 1.0
+        if not np.allclose(steps, steps[0]) or not np.isclose(factor, round(factor)):
+            raise ValueError(
+                "Block mean resampling needs a regular time axis with a step "
+                f"dividing {resample.interval} hours"
+            )
+        ds = ds.coarsen(time=round(factor), boundary="trim").mean(keep_attrs=True)  # type: ignore
+        for vname in ds.data_vars:
+            ds[vname].attrs["cell_methods"] = (
+                f"time: mean (interval: {resample.interval:g} hours)"
+            )
+        return ds
+
+    targets = values[0] + np.arange(np.floor(offsets[-1] + 1e-6) + 1) * interval
+    lower = np.clip(
+        np.searchsorted(values, targets, side="right") - 1, 0, len(values) - 2
+    )
+    weight = xr.DataArray(
+        (targets - values[lower]) / np.diff(values)[lower], dims="time"
+    )
+    interp = ds.drop_vars("time")
+    interp = (
+        interp.isel(time=lower) * (1 - weight) + interp.isel(time=lower + 1) * weight
+    )
+    return interp.assign_coords(time=("time", targets, time.attrs))
+
+
+def unpacked_fields(
+    ds: xr.Dataset,
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+    derived: list[str] | None = None,
+) -> tuple[xr.Dataset, dict[str, FieldAttr]]:
+    """
+    Apply the addc/mulc unit conversion and add the `derived` variables.
+
+    Returns the dataset and the output attributes of every field to pack.
+    """
     for vname, dfield in dset_map.data_vars.items():
+        # Not in place: `ds` may be a view into a block shared by several boxes
         if dfield.addc != 0.0:
-            ds[vname] += dfield.addc
+            ds[vname] = ds[vname] + dfield.addc
         if dfield.mulc != 1.0:
-            ds[vname] *= dfield.mulc
+            ds[vname] = ds[vname] * dfield.mulc
+
+    fields = {vname: dset_type["data_vars"][vname] for vname in dset_map.data_vars}
+    if derived:
+        if unknown := set(derived) - dset_map.derived.keys():
+            raise ValueError(
+                f"Unknown derived variables {sorted(unknown)}, "
+                f"available: {', '.join(dset_map.derived) or 'none'}"
+            )
+        expressions = {name: dvar.expr for name, dvar in dset_map.derived.items()}
+        ds = ds.assign(evaluate_derived(ds, expressions, derived))
+        fields.update({name: dset_map.derived[name].field_attr() for name in derived})
+    return ds, fields
+
+
+def field_ranges(ds: xr.Dataset, fields: Iterable[str]) -> dict[str, tuple[Any, Any]]:
+    """(min, max) of each field; lazy if `ds` is dask backed."""
+    return {vname: (ds[vname].min(), ds[vname].max()) for vname in fields}
+
+
+def pack_fields(
+    ds: xr.Dataset,
+    fields: dict[str, FieldAttr],
+    ranges: dict[str, tuple[Any, Any]],
+    precision: Precision = Precision.native,
+) -> xr.Dataset:
+    """Pack `fields` to int16 given their computed (min, max) `ranges`."""
+    for vname, data_vars_type in fields.items():
         valid_min, valid_max = (  # type: ignore
-            ds[vname].min().values,  # type: ignore
-            ds[vname].max().values,  # type: ignore
+            ranges[vname][0].values,  # type: ignore
+            ranges[vname][1].values,  # type: ignore
         )  # type: ignore
-        scale_fac, add_off, missing_val = compute_scale_and_offset(valid_min, valid_max)  # type: ignore
+        if precision == Precision.float32:
+            scale_fac, add_off, missing_val = compute_scale_and_offset(
+                float(valid_min),  # type: ignore
+                float(valid_max),  # type: ignore
+            )
+            scale_fac, add_off = np.float32(scale_fac), np.float32(add_off)
+            valid_min, valid_max = np.float32(valid_min), np.float32(valid_max)  # type: ignore
+        else:
+            scale_fac, add_off, missing_val = compute_scale_and_offset(
+                valid_min, valid_max
+            )  # type: ignore
         scaled_data = ((ds[vname] - add_off) / scale_fac).astype(np.int16)  # type: ignore
         scaled_data = scaled_data.where(~np.isnan(ds[vname]), missing_val)
         ds[vname] = scaled_data
@@ -88,7 +347,6 @@ def process(
         ds[vname].attrs["missing_value"] = missing_val
         ds[vname].attrs["valid_min"] = valid_min
         ds[vname].attrs["valid_max"] = valid_max
-        data_vars_type = dset_type["data_vars"][vname]
         ds[vname].attrs["units"] = data_vars_type.units
         ds[vname].attrs["standard_name"] = data_vars_type.standard_name
         ds[vname].attrs["long_name"] = data_vars_type.long_name
@@ -97,11 +355,442 @@ def process(
     ds["longitude"] = ds["longitude"].astype(np.float32)  # type: ignore
     ds = ds.assign_coords(longitude=(ds["longitude"].values + 180) % 360 - 180)  # type: ignore
     ds["latitude"] = ds["latitude"].astype(np.float32)  # type: ignore
+    return ds
+
+
+def pack(
+    ds: xr.Dataset,
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+    precision: Precision = Precision.native,
+    derived: list[str] | None = None,
+) -> xr.Dataset:
+    """
+    Pack the loaded data variables to int16 and attach the output attributes.
+
+    With `float32` precision the packing parameters are computed in float64
+    from the data range, then stored and applied as float32, so the data is
+    scaled without leaving float32.
+
+    The `derived` variables of `dset_map` are evaluated from the unit
+    converted data variables, on the same in-memory block, and packed with them.
+    """
+    ds, fields = unpacked_fields(ds, dset_map, dset_type, derived)
+    return pack_fields(ds, fields, field_ranges(ds, fields), precision)
+
+
+def output_path(output: Path, output_format: OutputFormat) -> Path:
+    """Path of the output written for `output` (a `.nc` file name) in `output_format`."""
+    if output_format == OutputFormat.zarr:
+        return output.with_suffix(".zarr")
+    return output
+
+
+def write(
+    ds: xr.Dataset,
+    output: Path,
+    output_format: OutputFormat = OutputFormat.netcdf,
+) -> str | None:
+    """Write `ds`, returning the sha256 of a NetCDF file (None for a Zarr store)."""
     output.parent.mkdir(parents=True, exist_ok=True)
-    ds.to_netcdf(output, unlimited_dims=["time"])  # type: ignore
+    if output_format == OutputFormat.zarr:
+        write_zarr(ds, output)
+        return None
+    return write_netcdf(ds, output)
+
+
+def forcing_key(
+    input: Path,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+) -> tuple[list[dict[str, Any]], str]:
+    """Input records and run key of the manifest entry of a processed file."""
+    inputs = [input_record(input)]
+    return inputs, run_key(
+        inputs,
+        box=lonlatbox,
+        mapping=dset_map.model_dump(mode="json"),
+        options=options.model_dump(mode="json", exclude=RUN_EXCLUDE),
+    )
+
+
+def source_key(
+    inputs: list[dict[str, Any]],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+) -> str:
+    """Run key without the box: outputs with the same source key differ only by box."""
+    return run_key(
+        inputs,
+        mapping=dset_map.model_dump(mode="json"),
+        options=options.model_dump(mode="json", exclude=RUN_EXCLUDE),
+    )
+
+
+def product_names(
+    ds: xr.Dataset, dset_map: DataSetMap, product: str | None = None
+) -> tuple[str | None, str | None]:
+    """
+    Category and product name of a processed dataset.
+
+    The product is `product` when given (e.g. a mapping of a user registry),
+    else the name of `dset_map` in the default registry, if it is there.
+    """
+    category = next(
+        (
+            name
+            for name, dset_type in dataset_types.items()
+            if set(dset_type["data_vars"]) <= set(ds.data_vars)
+        ),
+        None,
+    )
+    if product:
+        return category, product
+    products: dict[str, DataSetMap] = getattr(data_maper, category or "", {})
+    product = next(
+        (name for name, m in products.items() if m is dset_map or m == dset_map), None
+    )
+    return category, product
+
+
+def grid_spacing(ds: xr.Dataset) -> dict[str, float | None]:
+    spacing: dict[str, float | None] = {}
+    for key, name in (("dlon", "longitude"), ("dlat", "latitude")):
+        values = np.asarray(ds[name].values, dtype=np.float64)
+        spacing[key] = abs(float(values[1] - values[0])) if values.size > 1 else None
+    return spacing
+
+
+def record_output(
+    ds: xr.Dataset,
+    output: Path,
+    checksum: str | None,
+    inputs: list[dict[str, Any]],
+    key: str,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+    timings: dict[str, float],
+    reused: Path | None = None,
+    product: str | None = None,
+):
+    """Add a written forcing file to the manifest of its directory and to the catalog."""
+    packing = packing_record(ds)
+    time = time_record(ds)
+    size = output_size(output)
+    entry: dict[str, Any] = {
+        "kind": "forcing",
+        "key": key,
+        "inputs": inputs,
+        "box": lonlatbox,
+        "mapping": dset_map.model_dump(mode="json"),
+        "options": options.model_dump(mode="json"),
+        "packing": packing,
+        "time": time,
+        "sha256": checksum,
+        "size": size,
+        "timings": timings,
+    }
+    if reused:
+        entry["reused"] = str(reused)
+    update_manifest(output, entry)
+    category, product = product_names(ds, dset_map, product)
+    catalog_record(
+        output,
+        {
+            "kind": "forcing",
+            "category": category,
+            "product": product,
+            "box": lonlatbox,
+            "start": time.get("start"),
+            "end": time.get("end"),
+            **grid_spacing(ds),
+            "packing": packing,
+            "key": key,
+            "source_key": source_key(inputs, dset_map, options),
+            "size": size,
+            "sha256": checksum,
+        },
+    )
+
+
+def reusable_output(
+    output: Path,
+    inputs: list[dict[str, Any]],
+    key: str,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+) -> CatalogEntry | None:
+    """A catalogued output of the same input and settings that covers `lonlatbox`."""
+    try:
+        entries = find_outputs(
+            lonlatbox, kind="forcing", source_key=source_key(inputs, dset_map, options)
+        )
+    except CATALOG_ERRORS as e:
+        logger.warning("Could not search the catalog, processing %s: %s", output, e)
+        return None
+    for entry in entries:
+        if entry.path == output.resolve():
+            continue
+        if options.target_grid and entry.key != key:
+            # the regridded grid does not follow the box
+            continue
+        return entry
+    return None
+
+
+def cut_output(source: Path, lonlatbox: list[float]) -> xr.Dataset:
+    """
+    The grid points of `lonlatbox` in a written output.
+
+    The packed data and its attributes are kept as stored, so the packing is
+    the one of the (larger) source output.
+    """
+    if source.is_dir():
+        ds = xr.open_zarr(source, mask_and_scale=False, decode_times=False)  # type: ignore
+    else:
+        ds = xr.open_dataset(source, mask_and_scale=False, decode_times=False)  # type: ignore
+    with ds:
+        lonmin, lonmax, latmin, latmax = lonlatbox
+        first, last = lon_range(lonmin, lonmax)
+        lon = np.asarray(ds["longitude"].values, dtype=np.float64)
+        lat = np.asarray(ds["latitude"].values, dtype=np.float64)
+        lon_in = np.ones(lon.shape, dtype=bool)
+        if last - first < 360.0:
+            # positions east of lonmin, in any longitude convention
+            east = np.mod(lon - first + CUT_TOLERANCE, 360.0)
+            lon_in = east <= last - first + 2 * CUT_TOLERANCE
+        lat_in = (lat >= latmin - CUT_TOLERANCE) & (lat <= latmax + CUT_TOLERANCE)
+        ds = ds.isel(longitude=np.flatnonzero(lon_in), latitude=np.flatnonzero(lat_in))
+        ds = ds.load()  # type: ignore
+    for var in ds.variables.values():
+        var.encoding = {}
+        if source.is_dir():
+            restore_attr_types(var)
     return ds
 
 
+def reuse_output(
+    output: Path,
+    inputs: list[dict[str, Any]],
+    key: str,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+    product: str | None = None,
+) -> xr.Dataset | None:
+    """Write `output` cut from a covering output (see `ProcessOptions.reuse`), if any."""
+    source = reusable_output(output, inputs, key, lonlatbox, dset_map, options)
+    if source is None:
+        return None
+    start = perf_counter()
+    ds = cut_output(source.path, lonlatbox)
+    checksum = write(ds, output, options.output_format)
+    timings = {"reuse": perf_counter() - start}
+    record_output(
+        ds,
+        output,
+        checksum,
+        inputs,
+        key,
+        lonlatbox,
+        dset_map,
+        options,
+        timings,
+        source.path,
+        product,
+    )
+    return ds
+
+
+def open_stages(
+    input: Path,
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+    time_chunk: int | None = None,
+) -> xr.Dataset:
+    """
+    Open an input lazily through the stages applied to the whole file.
+
+    The variables are renamed and decoded in the working precision, then the
+    time axis is resampled. With `time_chunk`, the file is chunked along time
+    first.
+    """
+    ds = open_mapped(input, dset_map, options.precision)
+    if time_chunk:
+        ds = ds.chunk({ds["time"].dims[0]: time_chunk})
+    if options.time_resample:
+        ds = resample_time(ds, options.time_resample)
+        if options.precision == Precision.float32:
+            # the linear interpolation weights are float64
+            ds = as_float32(ds)
+    return ds
+
+
+def read_box(
+    ds: xr.Dataset,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+) -> list[float]:
+    """The part of `ds` needed for `lonlatbox`, with the neighbours for regridding."""
+    if options.target_grid:
+        return pad_box(ds[next(iter(dset_map.data_vars))], lonlatbox)
+    return lonlatbox
+
+
+def box_stages(
+    ds: xr.Dataset,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    options: ProcessOptions,
+) -> xr.Dataset:
+    """
+    The stages between `open_stages` and packing, for one box.
+
+    `ds` is opened by `open_stages`, or is a part of it holding the
+    `read_box` of the box. The box is subset, coastal cells are filled and the
+    data is regridded, lazily if `ds` is.
+    """
+    ds = subset_dataset(ds, read_box(ds, lonlatbox, dset_map, options), dset_map)
+    if options.fill_cells:
+        ds = fill_coastal(ds, options.fill_cells)
+    if options.target_grid:
+        ds = regrid_dataset(ds, options.target_grid)
+    return ds
+
+
+def process(
+    input: Path,
+    lonlatbox: list[float],
+    output: Path,
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+    options: ProcessOptions | None = None,
+    product: str | None = None,
+):
+    """
+    Subset, pack and write one input file for a box.
+
+    The output is recorded in the manifest of its directory and in the
+    catalog, under the name `product` of its mapping (by default, the name
+    of `dset_map` in the default registry). Returns the written dataset, or None when `options.skip_unchanged`
+    is set and the manifest shows the output is up to date. With
+    `options.reuse`, an output cut from a covering one is returned instead of
+    processing the input.
+    """
+    options = options or ProcessOptions()
+    output = output_path(output, options.output_format)
+    inputs, key = forcing_key(input, lonlatbox, dset_map, options)
+    if options.skip_unchanged and is_current(output, key):
+        return None
+    if options.reuse:
+        reused = reuse_output(
+            output, inputs, key, lonlatbox, dset_map, options, product
+        )
+        if reused is not None:
+            return reused
+    start = perf_counter()
+    ds = open_stages(input, dset_map, options)
+    ds = box_stages(ds, lonlatbox, dset_map, options)
+    ds.load()  # type: ignore
+    timings = {"read": perf_counter() - start}
+    start = perf_counter()
+    ds = pack(ds, dset_map, dset_type, options.precision, options.derived)
+    timings["compute"] = perf_counter() - start
+    start = perf_counter()
+    checksum = write(ds, output, options.output_format)
+    timings["write"] = perf_counter() - start
+    record_output(
+        ds,
+        output,
+        checksum,
+        inputs,
+        key,
+        lonlatbox,
+        dset_map,
+        options,
+        timings,
+        product=product,
+    )
+    return ds
+
+
+def process_boxes(
+    input: Path,
+    lonlatboxes: list[list[float]],
+    outputs: list[Path],
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+    options: ProcessOptions | None = None,
+    product: str | None = None,
+) -> list[xr.Dataset]:
+    """
+    Same as `process` for several boxes, reading the input only once.
+
+    The union hyperslab of all boxes is loaded in a single read per
+    variable; each box is then subset and packed from that in-memory block,
+    so the packing statistics are still computed per box. Boxes skipped as
+    unchanged (see `process`) have None in the returned list; boxes reused
+    from covering outputs are left out of the read.
+    """
+    options = options or ProcessOptions()
+    outputs = [output_path(output, options.output_format) for output in outputs]
+    keys = [forcing_key(input, box, dset_map, options) for box in lonlatboxes]
+    done: dict[int, xr.Dataset | None] = {}
+    for i, (box, output, (inputs, key)) in enumerate(zip(lonlatboxes, outputs, keys)):
+        if options.skip_unchanged and is_current(output, key):
+            done[i] = None
+        elif options.reuse:
+            reused = reuse_output(output, inputs, key, box, dset_map, options, product)
+            if reused is not None:
+                done[i] = reused
+    if len(done) == len(outputs):
+        return [done[i] for i in range(len(outputs))]  # type: ignore
+    start = perf_counter()
+    ds = open_stages(input, dset_map, options)
+    todo = [
+        read_box(ds, box, dset_map, options)
+        for i, box in enumerate(lonlatboxes)
+        if i not in done
+    ]
+    ds = ds.isel(union_hyperslab(ds[next(iter(dset_map.data_vars))], todo))  # type: ignore
+    ds.load()  # type: ignore
+    read_time = perf_counter() - start
+    ret: list[xr.Dataset] = []
+    for i, (box, output, (inputs, key)) in enumerate(
+        zip(lonlatboxes, outputs, keys, strict=True)
+    ):
+        if i in done:
+            ret.append(done[i])  # type: ignore
+            continue
+        # the single read is shared by all boxes
+        timings = {"read": read_time}
+        start = perf_counter()
+        box_ds = box_stages(ds, box, dset_map, options)
+        box_ds = pack(box_ds, dset_map, dset_type, options.precision, options.derived)
+        timings["compute"] = perf_counter() - start
+        start = perf_counter()
+        checksum = write(box_ds, output, options.output_format)
+        timings["write"] = perf_counter() - start
+        record_output(
+            box_ds,
+            output,
+            checksum,
+            inputs,
+            key,
+            box,
+            dset_map,
+            options,
+            timings,
+            product=product,
+        )
+        ret.append(box_ds)
+    return ret
+
+
 def process_time(time: xr.DataArray) -> xr.DataArray:
     units = time.attrs["units"].lower()
     start_date = pd.to_datetime(  # type: ignore
@@ -162,11 +851,14 @@ def process_meteo_file(
     latmin: float,
     latmax: float,
     output_dir: str,
+    product: str = "gfsnc_wgrib2",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
 ):
     """Create Meteorology inputs"""
     lonmin = to_360(lonmin)
     lonmax = to_360(lonmax)
-    data_maps = data_maper.meteo[MeteoMap.gfsnc_wgrib2.value]  # type: ignore
+    data_maps = (dataset_maper or data_maper).get("meteo", product)
     output = Path(output_dir) / Path(infile).name
     return process(
         Path(infile),
@@ -174,6 +866,8 @@ def process_meteo_file(
         output,
         data_maps,
         meteo_dataset,
+        options,
+        product,
     )
 
 
@@ -184,9 +878,12 @@ def process_ocean_file(
     latmin: float,
     latmax: float,
     output_dir: str,
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
 ):
     """Create Ocean inputs"""
-    data_maps = data_maper.ocean[OceanMap.cmems.value]  # type: ignore
+    data_maps = (dataset_maper or data_maper).get("ocean", product)
     output = Path(output_dir) / Path(infile).name
     return process(
         Path(infile),
@@ -194,6 +891,8 @@ def process_ocean_file(
         output,
         data_maps,
         ocean_dataset,
+        options,
+        product,
     )
 
 
@@ -204,9 +903,12 @@ def process_wave_file(
     latmin: float,
     latmax: float,
     output_dir: str,
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
 ):
     """Create Ocean inputs"""
-    data_maps = data_maper.waves[WaveMap.cmems.value]  # type: ignore
+    data_maps = (dataset_maper or data_maper).get("waves", product)
     output = Path(output_dir) / Path(infile).name
     return process(
         Path(infile),
@@ -214,7 +916,289 @@ def process_wave_file(
         output,
         data_maps,
         waves_dataset,
+        options,
+        product,
+    )
+
+
+def process_meteo_file_boxes(
+    infile: str,
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "gfsnc_wgrib2",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """Create Meteorology inputs for several boxes from one read"""
+    lonlatboxes = [
+        [to_360(lonmin), to_360(lonmax), latmin, latmax]
+        for lonmin, lonmax, latmin, latmax in boxes
+    ]
+    data_maps = (dataset_maper or data_maper).get("meteo", product)
+    outputs = [Path(output_dir) / Path(infile).name for output_dir in output_dirs]
+    return process_boxes(
+        Path(infile),
+        lonlatboxes,
+        outputs,
+        data_maps,
+        meteo_dataset,
+        options,
+        product,
+    )
+
+
+def process_ocean_file_boxes(
+    infile: str,
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """Create Ocean inputs for several boxes from one read"""
+    data_maps = (dataset_maper or data_maper).get("ocean", product)
+    outputs = [Path(output_dir) / Path(infile).name for output_dir in output_dirs]
+    return process_boxes(
+        Path(infile),
+        boxes,
+        outputs,
+        data_maps,
+        ocean_dataset,
+        options,
+        product,
+    )
+
+
+def process_wave_file_boxes(
+    infile: str,
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """Create Wave inputs for several boxes from one read"""
+    data_maps = (dataset_maper or data_maper).get("waves", product)
+    outputs = [Path(output_dir) / Path(infile).name for output_dir in output_dirs]
+    return process_boxes(
+        Path(infile),
+        boxes,
+        outputs,
+        data_maps,
+        waves_dataset,
+        options,
+        product,
+    )
+
+
+def detected_job(
+    infile: str,
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+    output_dir: str,
+    detection: Detection,
+    options: ProcessOptions | None = None,
+) -> tuple[list[float], Path, ProcessOptions]:
+    """Box (in the longitude range of the file), output path and options of a detected input."""
+    lon_name = detection.dset_map.coords["longitude"].name
+    with xr.open_dataset(infile, decode_times=False) as ds:  # type: ignore
+        if float(ds[lon_name].max()) > 180.0:
+            lonmin = to_360(lonmin)
+            lonmax = to_360(lonmax)
+    options = options or ProcessOptions()
+    output = output_path(
+        Path(output_dir) / detection.category / Path(infile).name,
+        options.output_format,
     )
+    if options.derived:
+        # the inputs mix categories: only derive the fields of this one
+        derived = [
+            name for name in options.derived if name in detection.dset_map.derived
+        ]
+        options = options.model_copy(update={"derived": derived})
+    return [lonmin, lonmax, latmin, latmax], output, options
+
+
+def process_file(
+    infile: str,
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+    output_dir: str,
+    detection: Detection,
+    options: ProcessOptions | None = None,
+) -> Path:
+    """Create inputs of a detected product, in `<output_dir>/<category>/`"""
+    lonlatbox, output, options = detected_job(
+        infile, lonmin, lonmax, latmin, latmax, output_dir, detection, options
+    )
+    process(
+        Path(infile),
+        lonlatbox,
+        output,
+        detection.dset_map,
+        dataset_types[detection.category],
+        options,
+        detection.product,
+    )
+    return output
+
+
+def lazy_process(
+    input: Path,
+    lonlatbox: list[float],
+    dset_map: DataSetMap,
+    dset_type: DataSetType,
+    options: ProcessOptions,
+    time_chunk: int,
+) -> tuple[xr.Dataset, dict[str, FieldAttr]]:
+    """The stages of `process` before packing, as a lazy graph chunked along time."""
+    ds = open_stages(input, dset_map, options, time_chunk)
+    ds = box_stages(ds, lonlatbox, dset_map, options)
+    return unpacked_fields(ds, dset_map, dset_type, options.derived)
+
+
+@contextmanager
+def dask_scheduler(execution: DaskExecution) -> Iterator[None]:
+    """Make the scheduler of `execution` the default one of `dask.compute`."""
+    if execution.scheduler == Scheduler.local_cluster:
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError:
+            raise ImportError(
+                "The local_cluster scheduler needs dask.distributed "
+                "(pip install osmond[distributed])"
+            ) from None
+        with (
+            LocalCluster(n_workers=execution.num_workers) as cluster,
+            Client(cluster),
+        ):
+            yield
+        return
+    if execution.scheduler == Scheduler.processes:
+        # one pool for both passes, instead of starting workers per compute
+        with (
+            ProcessPoolExecutor(
+                max_workers=execution.num_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            ) as pool,
+            dask.config.set(scheduler="processes", pool=pool),
+        ):
+            yield
+        return
+    with dask.config.set(scheduler="threads", num_workers=execution.num_workers):
+        yield
+
+
+def process_files_dask(
+    infiles: list[str],
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+    output_dir: str,
+    detections: list[Detection],
+    options: ProcessOptions | None,
+    execution: DaskExecution,
+) -> list[Path]:
+    """
+    `process_files` as one lazy dask graph over all the files.
+
+    A first compute gets the packing range of every field of every file, a
+    second one packs all the files chunk by chunk and writes the chunks as
+    they are computed, so both passes share the I/O and the workers across
+    files.
+    """
+    jobs: list[tuple[Any, ...]] = []
+    outputs: list[Path] = []
+    with dask_scheduler(execution):
+        for infile, detection in zip(infiles, detections):
+            lonlatbox, output, file_options = detected_job(
+                infile, lonmin, lonmax, latmin, latmax, output_dir, detection, options
+            )
+            outputs.append(output)
+            inputs, key = forcing_key(
+                Path(infile), lonlatbox, detection.dset_map, file_options
+            )
+            if file_options.skip_unchanged and is_current(output, key):
+                continue
+            if file_options.reuse and (
+                reuse_output(
+                    output,
+                    inputs,
+                    key,
+                    lonlatbox,
+                    detection.dset_map,
+                    file_options,
+                    detection.product,
+                )
+                is not None
+            ):
+                continue
+            ds, fields = lazy_process(
+                Path(infile),
+                lonlatbox,
+                detection.dset_map,
+                dataset_types[detection.category],
+                file_options,
+                execution.time_chunk,
+            )
+            jobs.append(
+                (output, ds, fields, inputs, key, lonlatbox, detection, file_options)
+            )
+
+        start = perf_counter()
+        (ranges,) = compute([field_ranges(job[1], job[2]) for job in jobs])
+        timings = {"batch_stats": perf_counter() - start}
+
+        start = perf_counter()
+        packed: list[xr.Dataset] = []
+        for job, job_ranges in zip(jobs, ranges):
+            output, ds, fields, *_, file_options = job
+            packed.append(pack_fields(ds, fields, job_ranges, file_options.precision))
+        writes = []
+        for job, ds in zip(jobs, packed):
+            output, *_, file_options = job
+            output.parent.mkdir(parents=True, exist_ok=True)
+            if file_options.output_format == OutputFormat.zarr:
+                # chunk aligned writes, from the workers that computed them
+                writes.append(write_zarr(ds, output, execution.time_chunk, False))
+            elif execution.scheduler == Scheduler.processes:
+                # the NetCDF write lock can not be passed to the pool workers:
+                # one task writes the whole file
+                writes.append(delayed(write_netcdf)(ds, output))
+            else:
+                # chunk by chunk, as the packed chunks are computed
+                writes.append(write_netcdf(ds, output, compute=False))
+        (written,) = compute(writes)
+        checksums: list[str | None] = []
+        for job, result in zip(jobs, written):
+            if job[-1].output_format == OutputFormat.zarr:
+                checksums.append(None)
+            elif isinstance(result, str):
+                checksums.append(result)
+            else:
+                checksums.append(file_sha256(job[0]))
+        timings["batch_write"] = perf_counter() - start
+
+    for job, ds, checksum in zip(jobs, packed, checksums):
+        output, _, _, inputs, key, lonlatbox, detection, file_options = job
+        record_output(
+            ds,
+            output,
+            checksum,
+            inputs,
+            key,
+            lonlatbox,
+            detection.dset_map,
+            file_options,
+            timings,
+            product=detection.product,
+        )
+    return outputs
 
 
 def process_meteo_files(
@@ -224,7 +1208,10 @@ def process_meteo_files(
     latmin: float,
     latmax: float,
     output_dir: str,
-):
+    product: str = "gfsnc_wgrib2",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+) -> list[xr.Dataset | None]:
     """
     Processes multiple meteorology input files and generates outputs for a specified geographic bounding box.
 
@@ -241,10 +1228,20 @@ def process_meteo_files(
             The maximum latitude for the geographic bounding box.
         output_dir (str):
             The directory where processed files will be saved.
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
 
     Returns:
-        None:
-            This function does not return a value. Processed files are saved in the specified `output_dir`.
+        list[xr.Dataset | None]:
+            The processed datasets, in the order of `infiles`; None for the
+            files skipped as unchanged (see `ProcessOptions.skip_unchanged`).
+            The files are saved in `output_dir`.
 
     Example:\n
         >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
@@ -255,12 +1252,22 @@ def process_meteo_files(
         >>> output_dir = "/path/to/output"
         >>> process_meteo_files(infiles, lonmin, lonmax, latmin, latmax, output_dir)
     """
-    ret: list[xr.Dataset] = []
+    ret: list[xr.Dataset | None] = []
     for infile in infiles:
-        ret.append(  # type: ignore
-            process_meteo_file(infile, lonmin, lonmax, latmin, latmax, output_dir)
+        ret.append(
+            process_meteo_file(
+                infile,
+                lonmin,
+                lonmax,
+                latmin,
+                latmax,
+                output_dir,
+                product,
+                dataset_maper,
+                options,
+            )
         )
-    return ret  # type: ignore
+    return ret
 
 
 def process_ocean_files(
@@ -270,7 +1277,10 @@ def process_ocean_files(
     latmin: float,
     latmax: float,
     output_dir: str,
-):
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+) -> list[xr.Dataset | None]:
     """
     Processes multiple ocean input files and generates outputs for a specified geographic bounding box.
 
@@ -287,10 +1297,20 @@ def process_ocean_files(
             The maximum latitude for the geographic bounding box.
         output_dir (str):
             The directory where processed files will be saved.
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
 
     Returns:
-        None:
-            This function does not return a value. Processed files are saved in the specified `output_dir`.
+        list[xr.Dataset | None]:
+            The processed datasets, in the order of `infiles`; None for the
+            files skipped as unchanged (see `ProcessOptions.skip_unchanged`).
+            The files are saved in `output_dir`.
 
     Example:\n
         >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
@@ -301,12 +1321,22 @@ def process_ocean_files(
         >>> output_dir = "/path/to/output"
         >>> process_meteo_files(infiles, lonmin, lonmax, latmin, latmax, output_dir)
     """
-    ret: list[xr.Dataset] = []
+    ret: list[xr.Dataset | None] = []
     for infile in infiles:
-        ret.append(  # type: ignore
-            process_ocean_file(infile, lonmin, lonmax, latmin, latmax, output_dir)
+        ret.append(
+            process_ocean_file(
+                infile,
+                lonmin,
+                lonmax,
+                latmin,
+                latmax,
+                output_dir,
+                product,
+                dataset_maper,
+                options,
+            )
         )
-    return ret  # type: ignore
+    return ret
 
 
 def process_wave_files(
@@ -316,7 +1346,10 @@ def process_wave_files(
     latmin: float,
     latmax: float,
     output_dir: str,
-):
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+) -> list[xr.Dataset | None]:
     """
     Processes multiple wave input files and generates outputs for a specified geographic bounding box.
 
@@ -333,10 +1366,20 @@ def process_wave_files(
             The maximum latitude for the geographic bounding box.
         output_dir (str):
             The directory where processed files will be saved.
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
 
     Returns:
-        None:
-            This function does not return a value. Processed files are saved in the specified `output_dir`.
+        list[xr.Dataset | None]:
+            The processed datasets, in the order of `infiles`; None for the
+            files skipped as unchanged (see `ProcessOptions.skip_unchanged`).
+            The files are saved in `output_dir`.
 
     Example:\n
         >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
@@ -347,9 +1390,269 @@ def process_wave_files(
         >>> output_dir = "/path/to/output"
         >>> process_meteo_files(infiles, lonmin, lonmax, latmin, latmax, output_dir)
     """
-    ret: list[xr.Dataset] = []
+    ret: list[xr.Dataset | None] = []
     for infile in infiles:
-        ret.append(  # type: ignore
-            process_wave_file(infile, lonmin, lonmax, latmin, latmax, output_dir)
+        ret.append(
+            process_wave_file(
+                infile,
+                lonmin,
+                lonmax,
+                latmin,
+                latmax,
+                output_dir,
+                product,
+                dataset_maper,
+                options,
+            )
+        )
+    return ret
+
+
+def process_meteo_files_boxes(
+    infiles: list[str],
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "gfsnc_wgrib2",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """
+    Processes multiple meteorology input files for several geographic bounding boxes at once.
+
+    Each input file is read only once: the hyperslab covering all the boxes is
+    loaded, and the output for every box is cut and packed from it.
+
+    Args:
+        infiles (list[str]):
+            A list of input file paths to process.
+        boxes (list[list[float]]):
+            The bounding boxes, each given as `[lonmin, lonmax, latmin, latmax]`.
+        output_dirs (list[str]):
+            The directory where processed files will be saved for each box
+            (same length as `boxes`).
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
+
+    Returns:
+        list[list[xr.Dataset]]:
+            The processed datasets, indexed as `[infile][box]`.
+
+    Example:\n
+        >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
+        >>> boxes = [[0.0, 10.0, -5.0, 5.0], [2.0, 4.0, -1.0, 1.0]]
+        >>> output_dirs = ["/path/to/output/outer", "/path/to/output/inner"]
+        >>> process_meteo_files_boxes(infiles, boxes, output_dirs)
+    """
+    ret: list[list[xr.Dataset]] = []
+    for infile in infiles:
+        ret.append(
+            process_meteo_file_boxes(
+                infile, boxes, output_dirs, product, dataset_maper, options
+            )
+        )
+    return ret
+
+
+def process_ocean_files_boxes(
+    infiles: list[str],
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """
+    Processes multiple ocean input files for several geographic bounding boxes at once.
+
+    Each input file is read only once: the hyperslab covering all the boxes is
+    loaded, and the output for every box is cut and packed from it.
+
+    Args:
+        infiles (list[str]):
+            A list of input file paths to process.
+        boxes (list[list[float]]):
+            The bounding boxes, each given as `[lonmin, lonmax, latmin, latmax]`.
+        output_dirs (list[str]):
+            The directory where processed files will be saved for each box
+            (same length as `boxes`).
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
+
+    Returns:
+        list[list[xr.Dataset]]:
+            The processed datasets, indexed as `[infile][box]`.
+
+    Example:\n
+        >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
+        >>> boxes = [[-10.0, 10.0, -5.0, 5.0], [-2.0, 2.0, -1.0, 1.0]]
+        >>> output_dirs = ["/path/to/output/outer", "/path/to/output/inner"]
+        >>> process_ocean_files_boxes(infiles, boxes, output_dirs)
+    """
+    ret: list[list[xr.Dataset]] = []
+    for infile in infiles:
+        ret.append(
+            process_ocean_file_boxes(
+                infile, boxes, output_dirs, product, dataset_maper, options
+            )
         )
-    return ret  # type: ignore
+    return ret
+
+
+def process_wave_files_boxes(
+    infiles: list[str],
+    boxes: list[list[float]],
+    output_dirs: list[str],
+    product: str = "cmems",
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+):
+    """
+    Processes multiple wave input files for several geographic bounding boxes at once.
+
+    Each input file is read only once: the hyperslab covering all the boxes is
+    loaded, and the output for every box is cut and packed from it.
+
+    Args:
+        infiles (list[str]):
+            A list of input file paths to process.
+        boxes (list[list[float]]):
+            The bounding boxes, each given as `[lonmin, lonmax, latmin, latmax]`.
+        output_dirs (list[str]):
+            The directory where processed files will be saved for each box
+            (same length as `boxes`).
+        product (str, optional):
+            Name of the input product mapping in the registry.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
+
+    Returns:
+        list[list[xr.Dataset]]:
+            The processed datasets, indexed as `[infile][box]`.
+
+    Example:\n
+        >>> infiles = ["/path/to/input1.nc", "/path/to/input2.nc"]
+        >>> boxes = [[-10.0, 10.0, -5.0, 5.0], [-2.0, 2.0, -1.0, 1.0]]
+        >>> output_dirs = ["/path/to/output/outer", "/path/to/output/inner"]
+        >>> process_wave_files_boxes(infiles, boxes, output_dirs)
+    """
+    ret: list[list[xr.Dataset]] = []
+    for infile in infiles:
+        ret.append(
+            process_wave_file_boxes(
+                infile, boxes, output_dirs, product, dataset_maper, options
+            )
+        )
+    return ret
+
+
+def process_files(
+    infiles: list[str],
+    lonmin: float,
+    lonmax: float,
+    latmin: float,
+    latmax: float,
+    output_dir: str,
+    dataset_maper: DataSetMaper | None = None,
+    options: ProcessOptions | None = None,
+    max_workers: int | None = None,
+    execution: DaskExecution | None = None,
+) -> list[Path]:
+    """
+    Processes a mix of meteorology, ocean and wave input files, detecting the product of each file.
+
+    The product mapping of every file is picked from the registry using its
+    variable names, CF standard names and global attributes (see
+    `osmond.detect.detect_product`), then the files are processed in parallel
+    worker processes. The workers are started by a fork server rather than
+    forked, so scripts calling this need an `if __name__ == "__main__":` guard.
+
+    Args:
+        infiles (list[str]):
+            A list of input file paths to process, of any registered product.
+        lonmin (float):
+            The minimum longitude for the geographic bounding box.
+        lonmax (float):
+            The maximum longitude for the geographic bounding box.
+        latmin (float):
+            The minimum latitude for the geographic bounding box.
+        latmax (float):
+            The maximum latitude for the geographic bounding box.
+        output_dir (str):
+            The directory where processed files will be saved, in a
+            `meteo`, `ocean` or `waves` sub-directory depending on the product.
+        dataset_maper (DataSetMaper, optional):
+            Product registry, e.g. from `load_dataset_maper` with extra user
+            mappings. Defaults to the bundled registry (plus `OSMOND_CONFIG_PATH`).
+        options (ProcessOptions, optional):
+            Optional processing stages (e.g. time resampling, regridding,
+            coastal fill).
+        max_workers (int, optional):
+            Maximum number of files processed concurrently.
+        execution (DaskExecution, optional):
+            Build the whole batch as one lazy dask graph, chunked along time,
+            and run it on a local dask scheduler (threads, processes or a
+            `LocalCluster`) instead of one worker process per file. Inputs
+            are never held whole: each worker holds a few time chunks
+            (`time_chunk` steps of one box) at a time, and NetCDF outputs are
+            written chunk by chunk, except with the `processes` scheduler,
+            which writes each NetCDF output from one task holding it whole.
+            Inputs are read twice (packing ranges, then the write).
+
+    Returns:
+        list[Path]:
+            The paths of the processed files, in the order of `infiles`.
+
+    Example:\n
+        >>> infiles = glob.glob("/path/to/inputs/*.nc")
+        >>> process_files(infiles, -10.0, 10.0, -5.0, 5.0, "/path/to/output")
+        >>> execution = DaskExecution(scheduler="processes", num_workers=8)
+        >>> process_files(infiles, -10.0, 10.0, -5.0, 5.0, "/path/to/output", execution=execution)
+    """
+    detections = [detect_file(infile, dataset_maper) for infile in infiles]
+    if execution:
+        return process_files_dask(
+            infiles,
+            lonmin,
+            lonmax,
+            latmin,
+            latmax,
+            output_dir,
+            detections,
+            options,
+            execution,
+        )
+    # not forked: a fork after threaded work (e.g. a dask compute) can deadlock
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        futures = [
+            executor.submit(
+                process_file,
+                infile,
+                lonmin,
+                lonmax,
+                latmin,
+                latmax,
+                output_dir,
+                detection,
+                options,
+            )
+            for infile, detection in zip(infiles, detections)
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,131 @@
+import fcntl
+import hashlib
+import json
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import xarray as xr
+
+from .verify import decode_time
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def input_record(path: str | Path) -> dict[str, Any]:
+    """Identity of an input file from its metadata (no read of the data)."""
+    stat = Path(path).stat()
+    return {
+        "path": str(Path(path).resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def run_key(inputs: list[dict[str, Any]], **settings: Any) -> str:
+    """Hash of the inputs and settings an output was made from."""
+    key = hashlib.sha256()
+    key.update(json.dumps(inputs, sort_keys=True).encode())
+    key.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return key.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    """sha256 of a file, read in blocks."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def write_netcdf(ds: xr.Dataset, output: Path, compute: bool = True) -> Any:
+    """
+    Write `ds` to `output`, returning the sha256 of the file.
+
+    The file is written straight to disk, then read back once in blocks to
+    hash it: netCDF-C seeks back over what it has written (e.g. the header on
+    close), so the bytes cannot be hashed as they are written. The hash is a
+    second pass over the file, but an output is never held in memory whole.
+    With `compute=False` the write is returned as a dask Delayed, which
+    writes the dask chunks of `ds` one by one as they are computed; hash the
+    file with `file_sha256` once it has run.
+    """
+    delayed = ds.to_netcdf(  # type: ignore
+        output, engine="netcdf4", unlimited_dims=["time"], compute=compute
+    )
+    return file_sha256(output) if compute else delayed
+
+
+def output_size(path: Path) -> int:
+    """Size of an output file, or of all the files of a directory store."""
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+
+def packing_record(ds: xr.Dataset) -> dict[str, dict[str, float]]:
+    """Packing attributes of the int16 data variables of `ds`."""
+    return {
+        str(vname): {
+            attr: float(da.attrs[attr])
+            for attr in ("scale_factor", "add_offset", "valid_min", "valid_max")
+            if attr in da.attrs
+        }
+        for vname, da in ds.data_vars.items()
+        if da.dtype == np.int16
+    }
+
+
+def time_record(ds: xr.Dataset) -> dict[str, Any]:
+    """Time coverage of an output dataset with `<unit> since <date>` times."""
+    time = ds["time"]
+    values = np.asarray(time.values, dtype=np.float64)
+    record: dict[str, Any] = {"units": time.attrs["units"], "ntimes": int(values.size)}
+    if values.size:
+        record["start"], record["end"] = decode_time(values[[0, -1]], record["units"])
+    return record
+
+
+def read_manifest(directory: str | Path) -> dict[str, Any]:
+    """The manifest of an output directory (empty if there is none)."""
+    path = Path(directory) / MANIFEST_NAME
+    try:
+        with path.open() as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "outputs": {}}
+    return manifest
+
+
+def update_manifest(output: Path, entry: dict[str, Any]):
+    """
+    Record `entry` for `output` in the manifest of its directory.
+
+    Entries are merged per output name; concurrent writers (e.g. the workers of
+    `process_files`) are serialised by a lock on the directory's lock file.
+    """
+    directory = output.parent
+    with (directory / f".{MANIFEST_NAME}.lock").open("w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = read_manifest(directory)
+        manifest["version"] = MANIFEST_VERSION
+        manifest["outputs"][output.name] = {
+            **entry,
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        }
+        tmp = directory / f".{MANIFEST_NAME}.{os.getpid()}.tmp"
+        with tmp.open("w") as f:
+            json.dump(manifest, f, indent=2)
+        tmp.replace(directory / MANIFEST_NAME)
+
+
+def is_current(output: Path, key: str) -> bool:
+    """Whether the manifest records `output` as made from the run `key`, unchanged since."""
+    entry = read_manifest(output.parent)["outputs"].get(output.name)
+    if not entry or entry.get("key") != key:
+        return False
+    try:
+        return output_size(output) == entry["size"]
+    except OSError:
+        return False
@@ -0,0 +1,165 @@
+"""Readers and writers for the Medslik `.bath` and `.map` text formats."""
+
+import hashlib
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+# Depth written for land points in a `.bath` file
+LAND_DEPTH = 9999.0
+
+
+class BathHeader(NamedTuple):
+    lon1: float
+    lon2: float
+    lat1: float
+    lat2: float
+    nlon: int
+    nlat: int
+    title: str
+
+
+class Bathymetry(NamedTuple):
+    lon: np.ndarray
+    lat: np.ndarray
+    # (nlat, nlon), south to north, `LAND_DEPTH` over land
+    depth: np.ndarray
+    title: str
+
+
+def format_fixed_int(values: np.ndarray, width: int) -> bytes:
+    """
+    Rows of `values` formatted like `%<width>.0f` without delimiter, one row per line.
+
+    Uses integer arithmetic on whole arrays instead of per-value formatting, for
+    finite values that round to non-negative integers of at most `width - 1` digits.
+    """
+    ivalues = np.rint(values).astype(np.int64)
+    nrow, ncol = ivalues.shape
+    chars = np.full((nrow, ncol, width), ord(" "), dtype=np.uint8)
+    for k in range(width - 1):
+        digit = (ivalues // 10**k) % 10 + ord("0")
+        chars[..., width - 1 - k] = np.where(
+            (ivalues >= 10**k) | (k == 0), digit, ord(" ")
+        )
+    newline = np.full((nrow, 1), ord("\n"), dtype=np.uint8)
+    return np.concatenate(
+        [chars.reshape(nrow, ncol * width), newline], axis=1
+    ).tobytes()
+
+
+def parse_fixed_int(body: bytes, nrow: int, ncol: int, width: int) -> np.ndarray | None:
+    """
+    Inverse of `format_fixed_int`, or None if `body` is not in that exact layout.
+    """
+    if len(body) != nrow * (ncol * width + 1):
+        return None
+    chars = np.frombuffer(body, dtype=np.uint8).reshape(nrow, ncol * width + 1)
+    if not (chars[:, -1] == ord("\n")).all():
+        return None
+    chars = chars[:, :-1].reshape(nrow, ncol, width)
+    is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+    if not (is_digit | (chars == ord(" "))).all() or not is_digit[..., -1].all():
+        return None
+    digits = np.where(is_digit, chars - ord("0"), 0).astype(np.int64)
+    return digits @ (10 ** np.arange(width - 1, -1, -1))
+
+
+def read_bath_header(path: Path) -> BathHeader:
+    """Read only the grid description of a `.bath` file."""
+    with path.open("r") as f:
+        title = f.readline().strip()
+        lon1, lon2, lat1, lat2 = map(float, f.readline().split())
+        nlon, nlat = map(int, f.readline().split())
+    return BathHeader(lon1, lon2, lat1, lat2, nlon, nlat, title)
+
+
+def write_bath(
+    path: Path,
+    depth: np.ndarray,
+    lon1: float,
+    lon2: float,
+    lat1: float,
+    lat2: float,
+    title: str = "Bathymetry",
+) -> str:
+    """
+    Write a Medslik `.bath` file, returning the sha256 of the written bytes.
+
+    `depth` is ordered south to north, as (nlat, nlon); it is written north to
+    south in `%5.0f` fields.
+    """
+    nlat, nlon = depth.shape
+    rows = np.flip(depth, axis=0)
+    # negative values, even -0.4 or -0.0, are written with a sign ("   -0")
+    if np.isfinite(rows).all() and not np.signbit(rows).any() and rows.max() < 9999.5:
+        body = format_fixed_int(rows, 5)
+    else:
+        body = (
+            (("%5.0f" * nlon) + "\n") * nlat % tuple(rows.ravel().tolist())
+        ).encode()
+    header = (
+        f" {title}\n"
+        # lon1 lon2 lat1 lat2 in Fortran XX4(xF10.6)
+        f"    {lon1:.6f}  {lon2:.6f}  {lat1:.6f}  {lat2:.6f}\n"
+        # nlon nlat in Fortran XX2(xF10.6)
+        f"    {nlon}  {nlat}\n"
+    ).encode()
+    checksum = hashlib.sha256()
+    with path.open("wb") as f:
+        for chunk in (header, body):
+            f.write(chunk)
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def read_bath(path: Path) -> Bathymetry:
+    """Read a Medslik `.bath` file, with the depth returned south to north."""
+    with path.open("rb") as f:
+        title = f.readline().decode().strip()
+        lon1, lon2, lat1, lat2 = map(float, f.readline().split())
+        nlon, nlat = map(int, f.readline().split())
+        body = f.read()
+    depth = parse_fixed_int(body, nlat, nlon, 5)
+    if depth is None:
+        depth = np.array(body.split(), dtype=np.float32)
+    depth = np.flip(depth.reshape(nlat, nlon).astype(np.float32), axis=0)
+    lon = np.linspace(lon1, lon2, nlon)
+    lat = np.linspace(lat1, lat2, nlat)
+    return Bathymetry(lon, lat, depth, title)
+
+
+def write_map(path: Path, polygons: list[np.ndarray], flag: int = 0) -> str:
+    """
+    Write closed polygons of (lon, lat) vertices to a Medslik `.map` file,
+    returning the sha256 of the written bytes.
+    """
+    checksum = hashlib.sha256()
+    with path.open("wb") as f:
+
+        def put(text: str):
+            chunk = text.encode()
+            f.write(chunk)
+            checksum.update(chunk)
+
+        put(f"{len(polygons)}\n")
+        for polygon in polygons:
+            npoints = len(polygon)
+            put(f"{npoints}  {flag}\n")
+            put(("%10.5f %10.5f\n" * npoints) % tuple(np.ravel(polygon).tolist()))
+    return checksum.hexdigest()
+
+
+def read_map(path: Path) -> list[np.ndarray]:
+    """Read the polygons of a Medslik `.map` file as (npoints, 2) arrays."""
+    with path.open("r") as f:
+        tokens = np.array(f.read().split(), dtype=np.float64)
+    polygons: list[np.ndarray] = []
+    pos = 1
+    for _ in range(int(tokens[0])):
+        npoints = int(tokens[pos])
+        pos += 2
+        polygons.append(tokens[pos : pos + 2 * npoints].reshape(npoints, 2))
+        pos += 2 * npoints
+    return polygons
@@ -0,0 +1,212 @@
+"""
+Overview pyramids of domain bathymetries and quick-look plots of domains.
+
+A pyramid holds the depth of a `.bath` grid averaged over 2x2, 4x4, ...
+blocks, down to `PYRAMID_MIN_SIZE` cells, in a compressed `.pyramid.npz`
+file written next to the `.bath`/`.map` files by `create_domain`. The
+quick-look plot draws the coarsest level that still has a cell per pixel,
+with `imshow`, and the coastline as a single NaN-separated polyline, so a large
+domain is previewed without parsing and meshing the full-resolution grid.
+"""
+
+import hashlib
+import io
+from pathlib import Path
+from typing import Any
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from .medslik_io import LAND_DEPTH, BathHeader, read_bath, read_map
+
+PYRAMID_SUFFIX = ".pyramid.npz"
+
+# Levels are added until the grid is at most this many cells wide and high
+PYRAMID_MIN_SIZE = 128
+
+
+def halve(depth: np.ndarray) -> np.ndarray:
+    """
+    Average of the 2x2 blocks of a depth grid with NaN over land.
+
+    Blocks with more land than water cells are land. An odd last row or
+    column is paired with a copy of itself.
+    """
+    nlat, nlon = depth.shape
+    depth = np.pad(depth, ((0, nlat % 2), (0, nlon % 2)), mode="edge")
+    blocks = depth.reshape(depth.shape[0] // 2, 2, depth.shape[1] // 2, 2)
+    water = np.isfinite(blocks).sum(axis=(1, 3))
+    total = np.nansum(blocks, axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(water >= 2, total / water, np.nan).astype(np.float32)
+
+
+def bathymetry_pyramid(
+    depth: np.ndarray, min_size: int = PYRAMID_MIN_SIZE
+) -> dict[int, np.ndarray]:
+    """
+    Levels of the pyramid of a `.bath` depth grid, by block size.
+
+    `depth` is (nlat, nlon), south to north, with `LAND_DEPTH` over land.
+    The levels have NaN over land.
+    """
+    level = np.where(depth == LAND_DEPTH, np.nan, depth).astype(np.float32)
+    levels: dict[int, np.ndarray] = {}
+    factor = 1
+    while max(level.shape) > min_size:
+        factor *= 2
+        level = halve(level)
+        levels[factor] = level
+    return levels
+
+
+def write_pyramid(
+    path: Path,
+    depth: np.ndarray,
+    lon1: float,
+    lon2: float,
+    lat1: float,
+    lat2: float,
+) -> str:
+    """Write the pyramid of a `.bath` depth grid, returning the sha256 of the file."""
+    nlat, nlon = depth.shape
+    levels = bathymetry_pyramid(depth)
+    # Any values: the numpy stubs also match `**arrays` against `allow_pickle: bool`
+    arrays: dict[str, Any] = {
+        f"depth_{factor}": level for factor, level in levels.items()
+    }
+    arrays["grid"] = np.array([lon1, lon2, lat1, lat2, nlon, nlat], dtype=np.float64)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    data = buffer.getvalue()
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_pyramid(path: Path) -> tuple[BathHeader, dict[int, np.ndarray]]:
+    """The grid of the `.bath` file and the levels of a pyramid file."""
+    with np.load(path) as f:
+        lon1, lon2, lat1, lat2, nlon, nlat = f["grid"].tolist()
+        levels = {
+            int(name.removeprefix("depth_")): f[name]
+            for name in f.files
+            if name.startswith("depth_")
+        }
+    header = BathHeader(lon1, lon2, lat1, lat2, int(nlon), int(nlat), "")
+    return header, levels
+
+
+def pyramid_level(levels: dict[int, np.ndarray], nx: int, ny: int) -> int:
+    """
+    Block size of the coarsest level with at least `nx` by `ny` cells.
+
+    Returns 1 (the full-resolution grid) when no level is that fine.
+    """
+    factors = [
+        factor
+        for factor, level in levels.items()
+        if level.shape[1] >= nx and level.shape[0] >= ny
+    ]
+    return max(factors, default=1)
+
+
+def coastline_path(polygons: list[np.ndarray]) -> np.ndarray:
+    """The closed rings of `polygons` as one polyline, separated by NaN vertices."""
+    if not polygons:
+        return np.empty((0, 2))
+    points = np.concatenate(polygons)
+    ends = np.cumsum([len(p) for p in polygons])
+    starts = ends - np.array([len(p) for p in polygons])
+    # each ring is closed by its first vertex, then broken by a NaN vertex
+    closing = np.repeat(points[starts], 2, axis=0)
+    closing[1::2] = np.nan
+    return np.insert(points, np.repeat(ends, 2), closing, axis=0)
+
+
+def quicklook(
+    domain: str | Path,
+    output: str | Path | None = None,
+    width: int = 1000,
+    dpi: int = 100,
+) -> Path:
+    """
+    Quick-look plot of a Medslik domain: its bathymetry and coastline.
+
+    The bathymetry is drawn from the pyramid level matching the size of the
+    plot in pixels, read from `<domain>.pyramid.npz` (see `create_domain`);
+    without a pyramid file, the levels are computed from `<domain>.bath`.
+
+    Args:
+        domain (str | Path):
+            Path of the domain files without extension.
+        output (str | Path, optional):
+            Path of the image. Defaults to `<domain>.png`.
+        width (int, optional):
+            Width of the image in pixels; the height follows the domain.
+        dpi (int, optional):
+            Resolution of the image.
+
+    Returns:
+            The path of the image.
+
+    Example:\n
+        >>> quicklook("./workdir/domain_output")  # writes domain_output.png
+    """
+    domain = Path(domain)
+    output = Path(output) if output else domain.with_suffix(".png")
+    pyramid = domain.with_suffix(PYRAMID_SUFFIX)
+    bathy = None
+    if pyramid.exists():
+        header, levels = read_pyramid(pyramid)
+    else:
+        bathy = read_bath(domain.with_suffix(".bath"))
+        header = BathHeader(
+            float(bathy.lon[0]),
+            float(bathy.lon[-1]),
+            float(bathy.lat[0]),
+            float(bathy.lat[-1]),
+            bathy.lon.size,
+            bathy.lat.size,
+            bathy.title,
+        )
+        levels = bathymetry_pyramid(bathy.depth)
+    dlon = (header.lon2 - header.lon1) / max(header.nlon - 1, 1)
+    dlat = (header.lat2 - header.lat1) / max(header.nlat - 1, 1)
+    west, south = header.lon1 - dlon / 2, header.lat1 - dlat / 2
+    east, north = header.lon2 + dlon / 2, header.lat2 + dlat / 2
+
+    aspect = (north - south) / (east - west)
+    fig, ax = plt.subplots(
+        figsize=(width / dpi, max(width * aspect * 0.8, 200) / dpi), dpi=dpi
+    )
+    try:
+        bbox = ax.get_window_extent()
+        factor = pyramid_level(levels, int(bbox.width), int(bbox.height))
+        if factor == 1:
+            if bathy is None:
+                bathy = read_bath(domain.with_suffix(".bath"))
+            depth = np.where(bathy.depth == LAND_DEPTH, np.nan, bathy.depth)
+        else:
+            depth = levels[factor]
+        # blocks of the last row/column may reach past the grid, cut by the limits
+        extent = (
+            west,
+            west + depth.shape[1] * factor * dlon,
+            south,
+            south + depth.shape[0] * factor * dlat,
+        )
+        image = ax.imshow(depth, origin="lower", extent=extent, interpolation="nearest")
+        fig.colorbar(image, ax=ax, label="Depth (m)")  # type: ignore
+        mapfile = domain.with_suffix(".map")
+        if mapfile.exists():
+            ax.add_collection(  # type: ignore
+                LineCollection([coastline_path(read_map(mapfile))], colors="orange")
+            )
+        ax.set_xlim(west, east)
+        ax.set_ylim(south, north)
+        ax.set_aspect("auto")
+        fig.savefig(output, dpi=dpi)  # type: ignore
+    finally:
+        plt.close(fig)
+    return output
@@ -0,0 +1,157 @@
+import hashlib
+import zipfile
+from typing import NamedTuple
+
+import numpy as np
+import xarray as xr
+
+from .config import TargetGrid, cache_dir, write_cache
+
+# Bump when the weights computation changes, to invalidate cached weights
+WEIGHTS_VERSION = "bilinear-2"
+
+
+class RegridWeights(NamedTuple):
+    # (ntarget, 4) flat indices into the (nlat * nlon) source grid
+    points: np.ndarray
+    # (ntarget, 4) bilinear weights of those source points
+    weight: np.ndarray
+
+
+_weights: dict[str, RegridWeights] = {}
+
+
+def grid_coords(grid: TargetGrid) -> tuple[np.ndarray, np.ndarray]:
+    return (
+        np.linspace(grid.lon1, grid.lon2, grid.nlon),
+        np.linspace(grid.lat1, grid.lat2, grid.nlat),
+    )
+
+
+def axis_weights(
+    source: np.ndarray, target: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lower/upper source positions and upper weight of each target point on one axis."""
+    if source.size == 1:
+        zeros = np.zeros(target.size, dtype=np.int64)
+        return zeros, zeros, np.zeros(target.size)
+    order = np.argsort(source)
+    ordered = source[order]
+    lower = np.clip(np.searchsorted(ordered, target) - 1, 0, source.size - 2)
+    weight = (target - ordered[lower]) / (ordered[lower + 1] - ordered[lower])
+    return order[lower], order[lower + 1], np.clip(weight, 0.0, 1.0)
+
+
+def bilinear_weights(
+    src_lon: np.ndarray, src_lat: np.ndarray, grid: TargetGrid
+) -> RegridWeights:
+    """
+    Bilinear interpolation weights from a regular source grid to `grid`.
+
+    Source longitudes are unwrapped (e.g. a box across 0/360) and target
+    longitudes are moved to the same 360 degree range. Target points outside
+    the source grid take the nearest edge values.
+    """
+    lon, lat = grid_coords(grid)
+    src_lon = np.unwrap(src_lon, period=360.0)
+    centre = (src_lon.min() + src_lon.max()) / 2
+    lon = centre + (lon - centre + 180.0) % 360.0 - 180.0
+
+    x0, x1, wx = axis_weights(src_lon, lon)
+    y0, y1, wy = axis_weights(src_lat, lat)
+    nlon = src_lon.size
+    # target points in (lat, lon) order
+    y0, y1, wy = (a[:, None] for a in (y0, y1, wy))
+    points = np.stack(
+        np.broadcast_arrays(
+            y0 * nlon + x0, y0 * nlon + x1, y1 * nlon + x0, y1 * nlon + x1
+        ),
+        axis=-1,
+    ).reshape(-1, 4)
+    weight = np.stack(
+        np.broadcast_arrays((1 - wy) * (1 - wx), (1 - wy) * wx, wy * (1 - wx), wy * wx),
+        axis=-1,
+    ).reshape(-1, 4)
+    return RegridWeights(points, weight)
+
+
+def get_weights(
+    src_lon: np.ndarray, src_lat: np.ndarray, grid: TargetGrid
+) -> RegridWeights:
+    """
+    `bilinear_weights`, cached in memory and in `cache_dir()` per source/target grid.
+    """
+    key = hashlib.sha256(WEIGHTS_VERSION.encode())
+    key.update(np.ascontiguousarray(src_lon, dtype=np.float64).tobytes())
+    key.update(np.ascontiguousarray(src_lat, dtype=np.float64).tobytes())
+    key.update(grid.model_dump_json().encode())
+    name = key.hexdigest()[:32]
+    if name in _weights:
+        return _weights[name]
+
+    cached = cache_dir() / f"regrid-{name}.npz"
+    weights = None
+    if cached.exists():
+        try:
+            with np.load(cached) as npz:
+                weights = RegridWeights(npz["points"], npz["weight"])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # stale or corrupt artifact, rebuilt below
+            cached.unlink(missing_ok=True)
+    if weights is None:
+        weights = bilinear_weights(src_lon, src_lat, grid)
+        write_cache(
+            cached, lambda f: np.savez(f, points=weights.points, weight=weights.weight)
+        )
+    _weights[name] = weights
+    return weights
+
+
+def apply_weights(data: np.ndarray, weights: RegridWeights, shape: tuple[int, int]):
+    """
+    Regrid the last two (lat, lon) axes of `data` to `shape`.
+
+    Equivalent to a sparse matrix product with four entries per target point,
+    done as one gather for all leading (time, depth) slices. Missing source
+    points are left out and the remaining weights renormalised.
+    """
+    flat = data.reshape(*data.shape[:-2], -1)
+    values = flat[..., weights.points]
+    valid = ~np.isnan(values)
+    weight = np.where(valid, weights.weight, 0.0).astype(data.dtype)
+    total = weight.sum(axis=-1)
+    out = (np.where(valid, values, 0.0) * weight).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(total > 0.0, out / total, np.nan).astype(data.dtype)
+    return out.reshape(*data.shape[:-2], *shape)
+
+
+def regrid_dataset(ds: xr.Dataset, grid: TargetGrid) -> xr.Dataset:
+    """Regrid the (..., latitude, longitude) data variables of `ds` onto `grid`."""
+    weights = get_weights(
+        ds["longitude"].values,  # type: ignore
+        ds["latitude"].values,  # type: ignore
+        grid,
+    )
+    lon, lat = grid_coords(grid)
+    regridded: dict[str, xr.DataArray] = {}
+    for vname, da in ds.data_vars.items():
+        out = xr.apply_ufunc(
+            apply_weights,
+            da.chunk({"latitude": -1, "longitude": -1}) if da.chunks else da,
+            kwargs={"weights": weights, "shape": (grid.nlat, grid.nlon)},
+            input_core_dims=[["latitude", "longitude"]],
+            output_core_dims=[["latitude", "longitude"]],
+            exclude_dims={"latitude", "longitude"},
+            dask="parallelized",
+            output_dtypes=[da.dtype],
+            dask_gufunc_kwargs={
+                "output_sizes": {"latitude": grid.nlat, "longitude": grid.nlon}
+            },
+            keep_attrs=True,
+        )
+        regridded[str(vname)] = out.assign_coords(
+            latitude=("latitude", lat, ds["latitude"].attrs),
+            longitude=("longitude", lon, ds["longitude"].attrs),
+        )
+    return xr.Dataset(regridded, attrs=ds.attrs)
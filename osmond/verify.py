@@ -0,0 +1,246 @@
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import netCDF4  # type: ignore
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+# Number of time steps sampled per variable
+TIME_SAMPLES = 8
+
+# Tolerance of the packing checks, relative to the packing quantum
+QUANTUM_TOLERANCE = 1.0
+
+# The netCDF-C library is not thread safe: one NetCDF file is read at a time
+NETCDF_LOCK = threading.Lock()
+
+
+def decode_time(values: np.ndarray, units: str) -> list[str]:
+    """ISO strings of `values` given in `<unit> since <date>` units."""
+    unit, _, reference = units.partition(" since ")
+    deltas = pd.to_timedelta(values, unit=unit.strip().lower().rstrip("s") or "h")  # type: ignore
+    return [str(t.isoformat()) for t in pd.Timestamp(reference.strip()) + deltas]
+
+
+class RawVariable(NamedTuple):
+    name: str
+    dims: tuple[str, ...]
+    shape: tuple[int, ...]
+    dtype: np.dtype
+    attrs: dict[str, Any]
+    # stored (packed) values, read on indexing
+    data: Any
+
+
+@contextmanager
+def open_raw(path: Path) -> Iterator[dict[str, RawVariable]]:
+    """The variables of a NetCDF file or Zarr store (a directory), undecoded."""
+    if path.is_dir():
+        with xr.open_zarr(  # type: ignore
+            path, chunks=None, mask_and_scale=False, decode_times=False
+        ) as ds:
+            yield {
+                str(name): RawVariable(
+                    str(name),
+                    tuple(map(str, var.dims)),
+                    var.shape,
+                    var.dtype,
+                    dict(var.attrs),
+                    var,
+                )
+                for name, var in ds.variables.items()
+            }
+        return
+    with NETCDF_LOCK, netCDF4.Dataset(path) as nc:  # type: ignore
+        nc.set_auto_maskandscale(False)
+        yield {
+            name: RawVariable(
+                name,
+                var.dimensions,
+                var.shape,
+                var.dtype,
+                {attr: var.getncattr(attr) for attr in var.ncattrs()},
+                var,
+            )
+            for name, var in nc.variables.items()
+        }
+
+
+def sample_slices(var: RawVariable, time_dim: str, stride: int) -> tuple[slice, ...]:
+    """Strided hyperslab: a few time steps and every `stride`-th grid point."""
+    slices: list[slice] = []
+    for dim, size in zip(var.dims, var.shape):
+        if dim == time_dim:
+            slices.append(slice(None, None, max(1, size // TIME_SAMPLES)))
+        elif dim in ("latitude", "longitude"):
+            slices.append(slice(None, None, stride))
+        else:
+            slices.append(slice(None))
+    return tuple(slices)
+
+
+def verify_variable(
+    var: RawVariable, time_dim: str, stride: int
+) -> tuple[dict[str, Any], list[str]]:
+    errors: list[str] = []
+    attrs = var.attrs
+    scale = float(attrs.get("scale_factor", 1.0))
+    offset = float(attrs.get("add_offset", 0.0))
+    missing = attrs.get("missing_value", np.iinfo(np.int16).min)
+    valid_min = float(attrs.get("valid_min", np.nan))
+    valid_max = float(attrs.get("valid_max", np.nan))
+
+    raw = np.asarray(var.data[sample_slices(var, time_dim, stride)])
+    present = raw != missing
+    info: dict[str, Any] = {
+        "sampled": int(raw.size),
+        "missing_fraction": float(1.0 - present.mean()) if raw.size else 1.0,
+        "valid_min": valid_min,
+        "valid_max": valid_max,
+    }
+    if not present.any():
+        errors.append(f"{var.name}: all sampled values are missing")
+        return info, errors
+
+    values = raw[present] * scale + offset
+    info["sample_min"] = float(values.min())
+    info["sample_max"] = float(values.max())
+    tolerance = QUANTUM_TOLERANCE * scale
+    if np.isnan(valid_min) or np.isnan(valid_max):
+        errors.append(f"{var.name}: no valid_min/valid_max")
+    elif scale > 0.0:
+        int_range = np.iinfo(np.int16).max - (np.iinfo(np.int16).min + 1)
+        if abs((valid_max - valid_min) / int_range - scale) > 1e-3 * scale:
+            errors.append(f"{var.name}: scale_factor does not match valid range")
+        if abs((valid_min + valid_max) / 2 - offset) > tolerance:
+            errors.append(f"{var.name}: add_offset does not match valid range")
+        if info["sample_min"] < valid_min - tolerance:
+            errors.append(f"{var.name}: values below valid_min")
+        if info["sample_max"] > valid_max + tolerance:
+            errors.append(f"{var.name}: values above valid_max")
+    return info, errors
+
+
+def verify_file(
+    path: str | Path,
+    stride: int = 4,
+    start: str | None = None,
+    end: str | None = None,
+) -> dict[str, Any]:
+    """
+    Check one processed NetCDF file or Zarr store without decoding it fully.
+
+    Reads the header, the time axis and a strided sample of the packed int16
+    data. Checks that time is increasing (and covers `start`..`end` if
+    given), that no variable is entirely missing in the sample, and that the
+    packing attributes agree with `valid_min`/`valid_max` and the data.
+    """
+    report: dict[str, Any] = {"path": str(path), "ok": False, "errors": []}
+    errors: list[str] = report["errors"]
+    try:
+        with open_raw(Path(path)) as variables:
+            time_var = variables["time"]
+            units = time_var.attrs["units"]
+            times = np.asarray(time_var.data[:], dtype=np.float64)
+            report["time"] = {"units": units, "ntimes": int(times.size)}
+            if times.size == 0:
+                errors.append("empty time axis")
+            else:
+                first, last = decode_time(times[[0, -1]], units)
+                report["time"].update(start=first, end=last)
+                if np.any(np.diff(times) <= 0):
+                    errors.append("time is not strictly increasing")
+                if start and pd.Timestamp(first) > pd.Timestamp(start):
+                    errors.append(f"time starts after {start}")
+                if end and pd.Timestamp(last) < pd.Timestamp(end):
+                    errors.append(f"time ends before {end}")
+
+            report["variables"] = {}
+            for name, var in variables.items():
+                if var.dtype != np.int16:
+                    continue
+                info, var_errors = verify_variable(var, time_var.dims[0], stride)
+                report["variables"][name] = info
+                errors += var_errors
+            if not report["variables"]:
+                errors.append("no packed variables")
+    except (OSError, KeyError, ValueError) as e:
+        errors.append(f"unreadable: {e!r}")
+    report["ok"] = not errors
+    return report
+
+
+def output_files(paths: list[str | Path]) -> list[Path]:
+    """Expand directories in `paths` to the NetCDF files and Zarr stores they contain."""
+    files: list[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir() and path.suffix != ".zarr":
+            files += sorted(
+                p
+                for p in path.rglob("*")
+                if (p.suffix == ".nc" and p.is_file())
+                or (p.suffix == ".zarr" and p.is_dir())
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def verify_outputs(
+    paths: list[str | Path],
+    stride: int = 4,
+    start: str | None = None,
+    end: str | None = None,
+    max_workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    Verifies processed forcing files, in threads, from sampled reads of the packed data.
+
+    Args:
+        paths (list[str | Path]):
+            Output files, Zarr stores or directories (searched recursively
+            for `*.nc` files and `*.zarr` stores).
+        stride (int, optional):
+            Sample every `stride`-th latitude and longitude.
+        start (str, optional):
+            ISO date that every file must cover.
+        end (str, optional):
+            ISO date that every file must reach.
+        max_workers (int, optional):
+            Maximum number of files checked concurrently (NetCDF files are
+            read one at a time, Zarr stores concurrently).
+
+    Returns:
+        dict:
+            A JSON-serialisable report, with `ok` (files were found and all
+            passed), `nfiles`, `failed` (paths of the failing files) and
+            per-file `files` entries holding the time coverage, per-variable
+            sample statistics and errors.
+
+    Example:\n
+        >>> report = verify_outputs(["/path/to/output"], start="2025-01-21T12:00:00")
+        >>> json.dumps(report["failed"])
+    """
+    files = output_files(paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reports = list(
+            executor.map(
+                verify_file,
+                files,
+                [stride] * len(files),
+                [start] * len(files),
+                [end] * len(files),
+            )
+        )
+    return {
+        # no files found is a failure, e.g. a wrong output directory
+        "ok": bool(reports) and all(r["ok"] for r in reports),
+        "nfiles": len(reports),
+        "failed": [r["path"] for r in reports if not r["ok"]],
+        "files": reports,
+    }
@@ -0,0 +1,86 @@
+"""Zarr output of the processed forcing, and its conversion to Medslik NetCDF."""
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import xarray as xr
+
+from .manifest import write_netcdf
+
+# Time steps per Zarr chunk when the data is not already chunked
+ZARR_TIME_CHUNK = 24
+
+PACKING_ATTRS = ("scale_factor", "add_offset", "valid_min", "valid_max")
+
+
+def require_zarr():
+    try:
+        import zarr  # type: ignore  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "The zarr output format needs the zarr package (pip install osmond[zarr])"
+        ) from None
+
+
+def write_zarr(
+    ds: xr.Dataset,
+    store: Path,
+    time_chunk: int = ZARR_TIME_CHUNK,
+    compute: bool = True,
+) -> Any:
+    """
+    Write a packed dataset to a local Zarr directory store with consolidated metadata.
+
+    The store has one chunk per `time_chunk` time steps (with the whole box),
+    and the dask chunks of `ds` are aligned to them, so every time block is
+    written by its own task, from whichever (thread, process or cluster)
+    worker computed it, without locks. With `compute=False` the writes are
+    returned as a dask Delayed to compute with other work.
+    """
+    require_zarr()
+    ds = ds.chunk({"time": time_chunk})
+    for da in ds.variables.values():
+        # chunking of the source files, not applicable to the store
+        da.encoding.pop("chunks", None)
+        da.encoding.pop("preferred_chunks", None)
+    return ds.to_zarr(store, mode="w", consolidated=True, compute=compute)  # type: ignore
+
+
+def restore_attr_types(var: xr.Variable):
+    """
+    Restore the attribute types lost in the Zarr (JSON) metadata.
+
+    `missing_value` takes the type of the data, and packing attributes that
+    are exact float32 values (as written from float32 data) become float32.
+    """
+    if "missing_value" in var.attrs:
+        var.attrs["missing_value"] = var.dtype.type(var.attrs["missing_value"])
+    for name in PACKING_ATTRS:
+        value = var.attrs.get(name)
+        if isinstance(value, float) and float(np.float32(value)) == value:
+            var.attrs[name] = np.float32(value)
+
+
+def zarr_to_netcdf(store: str | Path, output: str | Path | None = None) -> Path:
+    """
+    Convert a Zarr store written by `process` to the Medslik NetCDF file.
+
+    The packed int16 data and its attributes are copied as stored, so the
+    result matches the file `process` writes with the NetCDF output format.
+
+    Example:\n
+        >>> zarr_to_netcdf("/path/to/output/meteo/gfs.zarr")  # writes gfs.nc
+    """
+    require_zarr()
+    store = Path(store)
+    output = Path(output) if output else store.with_suffix(".nc")
+    with xr.open_zarr(  # type: ignore
+        store, consolidated=True, mask_and_scale=False, decode_times=False
+    ) as ds:
+        ds = ds.load()  # type: ignore
+    for var in ds.variables.values():
+        var.encoding = {}
+        restore_attr_types(var)
+    write_netcdf(ds, output)
+    return output
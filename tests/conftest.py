@@ -0,0 +1,12 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def osmond_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Keep the on-disk caches and the catalog of each test in its tmp_path."""
+    cache = tmp_path / ".osmond"
+    monkeypatch.setenv("OSMOND_CACHE_DIR", str(cache))
+    monkeypatch.setenv("OSMOND_CATALOG", str(cache / "catalog.sqlite"))
+    return cache
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from osmond import config
+from osmond.config import data_maper, load_dataset_maper
+
+USER_REGISTRY = """
+meteo:
+  era5:
+    data_vars:
+      pmsl:
+        name: msl
+        mulc: 0.01
+      tair2m:
+        name: t2m
+        addc: -273.15
+      x_wind10:
+        name: u10
+      y_wind10:
+        name: v10
+    coords:
+      longitude:
+        name: longitude
+      latitude:
+        name: latitude
+      time:
+        name: valid_time
+"""
+
+
+def write_registry(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(USER_REGISTRY)
+    return path
+
+
+def test_user_registry_adds_product(tmp_path: Path):
+    registry = load_dataset_maper([write_registry(tmp_path / "user.yml")])
+    assert registry.get("meteo", "era5").coords["time"].name == "valid_time"
+    # the bundled products are kept
+    assert registry.meteo.keys() == {*data_maper.meteo, "era5"}
+
+
+def test_config_path_environment(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    write_registry(tmp_path / "registries" / "user.yaml")
+    assert "era5" not in load_dataset_maper().meteo
+    monkeypatch.setenv("OSMOND_CONFIG_PATH", str(tmp_path / "registries"))
+    assert "era5" in load_dataset_maper().meteo
+
+
+def test_registry_cache_hit(
+    tmp_path: Path, osmond_cache: Path, monkeypatch: pytest.MonkeyPatch
+):
+    registry = write_registry(tmp_path / "user.yml")
+    expected = load_dataset_maper([registry])
+    assert len(list(osmond_cache.glob("registry-*.pkl"))) == 1
+
+    def parse(files: list[Path]):
+        raise AssertionError("registry parsed again")
+
+    monkeypatch.setattr(config, "parse_dataset_maper", parse)
+    assert load_dataset_maper([registry]) == expected
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"not a pickle",
+        # a pickle of a class that no longer exists, e.g. from another version
+        b"cosmond_removed_module\nRegistry\n.",
+    ],
+    ids=["corrupt", "stale"],
+)
+def test_bad_registry_cache_rebuilt(tmp_path: Path, osmond_cache: Path, content: bytes):
+    registry = write_registry(tmp_path / "user.yml")
+    expected = load_dataset_maper([registry])
+    (cached,) = osmond_cache.glob("registry-*.pkl")
+    cached.write_bytes(content)
+
+    assert load_dataset_maper([registry]) == expected
+    assert cached.read_bytes() != content
+
+
+def test_unknown_product():
+    with pytest.raises(ValueError, match="Unknown meteo product 'era5', available: "):
+        data_maper.get("meteo", "era5")
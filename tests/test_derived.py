@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from osmond.derived import evaluate_derived, expression_names, parse_expression
+
+
+def wind_dataset() -> xr.Dataset:
+    u = np.array([[1.0, 0.0], [-3.0, 0.0]], dtype=np.float32)
+    v = np.array([[0.0, -2.0], [4.0, 0.0]], dtype=np.float32)
+    dims = ("latitude", "longitude")
+    return xr.Dataset({"x_wind10": (dims, u), "y_wind10": (dims, v)})
+
+
+def test_expression_names():
+    expr = "mod(270 - degrees(arctan2(y_wind10, x_wind10)), 360)"
+    assert expression_names(expr) == {"x_wind10", "y_wind10"}
+    assert expression_names("2 * pi * speed") == {"speed"}
+
+
+@pytest.mark.parametrize(
+    "expr",
+    ["__import__('os')", "x.real", "x if y else z", "x < 1", "f(x)", "1 + 2", "x +"],
+)
+def test_rejected_expressions(expr: str):
+    with pytest.raises(ValueError):
+        parse_expression(expr)
+
+
+def test_evaluate_with_dependencies():
+    ds = wind_dataset()
+    expressions = {
+        "wind10": "hypot(x_wind10, y_wind10)",
+        "wind10_knots": "wind10 * 1.943844",
+        "wind_dir10": "mod(270 - degrees(arctan2(y_wind10, x_wind10)), 360)",
+    }
+    out = evaluate_derived(ds, expressions, ["wind10_knots", "wind_dir10"])
+
+    assert list(out) == ["wind10_knots", "wind_dir10"]
+    assert out["wind10_knots"].dtype == np.float32
+    np.testing.assert_allclose(
+        out["wind10_knots"], [[1.943844, 3.887688], [9.71922, 0.0]], rtol=1e-6
+    )
+    # westerly, northerly, south-easterly and calm
+    np.testing.assert_allclose(out["wind_dir10"], [[270.0, 0.0], [143.13011, 270.0]])
+
+
+def test_circular_dependencies():
+    expressions = {"a": "b + x_wind10", "b": "a * 2"}
+    with pytest.raises(ValueError, match="Circular"):
+        evaluate_derived(wind_dataset(), expressions, ["a"])
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from osmond.config import ProcessOptions, load_dataset_maper
+from osmond.detect import detect_file
+from osmond.forcing import process_file
+
+
+def write_cf_ocean(path: Path, attrs: dict[str, str] | None = None):
+    """An ocean file with non-canonical names, identified by CF metadata only."""
+    rng = np.random.default_rng(0)
+    lon = np.arange(10.0, 12.0, 0.25)
+    lat = np.arange(35.0, 37.0, 0.25)
+    dims = ("time", "depth", "lat", "lon")
+    shape = (3, 1, lat.size, lon.size)
+    data_vars = {}
+    for name, standard_name in (
+        ("u", "eastward_sea_water_velocity"),
+        ("v", "northward_sea_water_velocity"),
+        ("temp", "sea_water_potential_temperature"),
+    ):
+        values = rng.normal(0.0, 1.0, shape)
+        values[..., :2, :2] = np.nan
+        data_vars[name] = (dims, values, {"standard_name": standard_name})
+    xr.Dataset(
+        data_vars,
+        coords={
+            "time": ("time", np.arange(3.0), {"units": "hours since 2025-01-01"}),
+            "depth": ("depth", [0.5], {"axis": "Z", "positive": "down"}),
+            "lat": ("lat", lat, {"axis": "Y", "units": "degrees_north"}),
+            "lon": ("lon", lon, {"axis": "X", "units": "degrees_east"}),
+        },
+        attrs=attrs,
+    ).to_netcdf(path)
+
+
+def test_detect_non_canonical_names(tmp_path: Path):
+    infile = tmp_path / "cf_ocean.nc"
+    write_cf_ocean(infile)
+
+    detection = detect_file(infile)
+    assert (detection.category, detection.product) == ("ocean", "cmems")
+    assert detection.dset_map.data_vars["uvel"].name == "u"
+    assert detection.dset_map.coords["longitude"].name == "lon"
+
+    for options in (ProcessOptions(), ProcessOptions(fill_cells=2)):
+        output = process_file(
+            str(infile),
+            10.2,
+            11.6,
+            35.2,
+            36.6,
+            str(tmp_path / "out"),
+            detection,
+            options,
+        )
+        with xr.open_dataset(output, decode_times=False) as ds:
+            assert ds["uvel"].dims == ("time", "depth", "latitude", "longitude")
+            assert set(ds.sizes) == {"time", "depth", "latitude", "longitude"}
+            np.testing.assert_allclose(ds["longitude"], np.arange(10.25, 11.6, 0.25))
+            assert int(ds["uvel"].isnull().sum()) == (0 if options.fill_cells else 12)
+
+
+def test_detect_by_global_attributes(tmp_path: Path):
+    # two more products with the variables of the bundled cmems mapping
+    registry = tmp_path / "registry.yml"
+    registry.write_text(
+        """
+ocean:
+  medsea:
+    match_attrs: {institution: Mediterranean Forecasting}
+    data_vars: {uvel: {name: uo}, vvel: {name: vo}, potemp: {name: thetao}}
+    coords: {longitude: {name: longitude}, latitude: {name: latitude},
+             time: {name: time}, depth: {name: depth}}
+  ibi:
+    match_attrs: {institution: IBI}
+    data_vars: {uvel: {name: uo}, vvel: {name: vo}, potemp: {name: thetao}}
+    coords: {longitude: {name: longitude}, latitude: {name: latitude},
+             time: {name: time}, depth: {name: depth}}
+"""
+    )
+    maper = load_dataset_maper([registry])
+    for institution, product in (
+        ("CMCC - Mediterranean Forecasting System", "medsea"),
+        ("IBI-MFC", "ibi"),
+        ("Other", "cmems"),
+        (None, "cmems"),
+    ):
+        infile = tmp_path / f"{product}-{institution}.nc"
+        write_cf_ocean(infile, {"institution": institution} if institution else None)
+        assert detect_file(infile, maper).product == product
+
+    # products sharing the variables and the attributes stay ambiguous
+    registry.write_text(registry.read_text().replace("IBI", "Mediterranean"))
+    infile = tmp_path / "ambiguous.nc"
+    write_cf_ocean(infile, {"institution": "Mediterranean Forecasting System"})
+    with pytest.raises(ValueError, match="Several product mappings match"):
+        detect_file(infile, load_dataset_maper([registry]))
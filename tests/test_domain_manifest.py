@@ -0,0 +1,132 @@
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+
+from osmond.coastline import CoastlineSimplify, to_polygons
+from osmond.domain import CoarsenMethod, coarsen_bathy, create_domain, create_domains
+from osmond.manifest import read_manifest
+from osmond.medslik_io import LAND_DEPTH, read_bath, read_map
+
+
+def write_island_bathymetry(path: Path):
+    """A GEBCO-like elevation grid: sea with a round island in the middle."""
+    lon = np.arange(10.0, 12.0, 0.02)
+    lat = np.arange(35.0, 37.0, 0.02)
+    radius = np.hypot(lon[None, :] - 11.0, lat[:, None] - 36.0)
+    elevation = np.where(radius < 0.4, 50.0, -100.0).astype(np.float32)
+    ds = xr.Dataset(
+        {"elevation": (("lat", "lon"), elevation)}, coords={"lat": lat, "lon": lon}
+    )
+    ds.to_netcdf(path)
+
+
+def map_land(path: Path, box: list[float]) -> shapely.Geometry:
+    """Land of a box: the box outside the sea enclosed by the `.map` rings."""
+    sea = reduce(shapely.symmetric_difference, to_polygons(read_map(path)))
+    return shapely.box(box[0], box[2], box[1], box[3]).difference(sea)
+
+
+def test_simplify_stats_in_manifest(tmp_path: Path):
+    bathymetry = tmp_path / "gebco.nc"
+    write_island_bathymetry(bathymetry)
+    simplify = CoastlineSimplify(tolerance=0.05)
+
+    create_domain(
+        str(bathymetry),
+        10.2,
+        11.8,
+        35.2,
+        36.8,
+        str(tmp_path / "one" / "domain"),
+        simplify=simplify,
+    )
+    create_domains(
+        str(bathymetry),
+        [[10.2, 11.8, 35.2, 36.8]],
+        [str(tmp_path / "many" / "domain")],
+        simplify=simplify,
+    )
+    for directory in ("one", "many"):
+        entries = read_manifest(tmp_path / directory)["outputs"]
+        stats = entries["domain.map"]["simplify_stats"]
+        # the land frame along the domain edges and the island
+        assert stats["features_in"] == stats["features_out"] == 2
+        assert 0 < stats["vertices_out"] < stats["vertices_in"]
+        assert "simplify_stats" not in entries["domain.bath"]
+
+    raw = tmp_path / "raw" / "domain"
+    create_domain(str(bathymetry), 10.2, 11.8, 35.2, 36.8, str(raw))
+    entries = read_manifest(raw.parent)["outputs"]
+    assert "simplify_stats" not in entries["domain.map"]
+
+
+@pytest.mark.parametrize("method", list(CoarsenMethod))
+def test_coarsened_domain(tmp_path: Path, method: CoarsenMethod):
+    # sea on a 0.02 degree grid, with a single land cell
+    lon = np.arange(10.0, 11.0, 0.02)
+    lat = np.arange(35.0, 36.0, 0.02)
+    elevation = np.full((lat.size, lon.size), -100.0, dtype=np.float32)
+    elevation[17, 12] = 10.0
+    bathymetry = tmp_path / "gebco.nc"
+    xr.Dataset(
+        {"elevation": (("lat", "lon"), elevation)}, coords={"lat": lat, "lon": lon}
+    ).to_netcdf(bathymetry)
+
+    output = tmp_path / "domain"
+    create_domain(
+        str(bathymetry),
+        10.0,
+        10.99,
+        35.0,
+        35.99,
+        str(output),
+        resolution=0.1,
+        coarsen_method=method,
+    )
+    bath = read_bath(output.with_suffix(".bath"))
+    # 5x5 blocks of the 50x50 cells
+    assert bath.depth.shape == (10, 10)
+    np.testing.assert_allclose(np.diff(bath.lon), 0.1, rtol=1e-3)
+    np.testing.assert_allclose(np.diff(bath.lat), 0.1, rtol=1e-3)
+    # the block of the land cell: land, or the sea depth averaged with it
+    # (95.6 m, written in whole metres)
+    expected = LAND_DEPTH if method == CoarsenMethod.min_depth else 96.0
+    assert bath.depth[3, 2] == expected
+    assert np.count_nonzero(bath.depth == LAND_DEPTH) == (method == "min_depth")
+
+
+def test_coarsen_single_column():
+    bathy = xr.DataArray(
+        np.zeros((3, 1)), coords={"lat": [0.0, 0.1, 0.2], "lon": [5.0]}
+    )
+    assert coarsen_bathy(bathy, 0.5) is bathy
+
+
+def test_create_domains_matches_create_domain(tmp_path: Path):
+    bathymetry = tmp_path / "gebco.nc"
+    write_island_bathymetry(bathymetry)
+    # a box across the island, a box nested in it, and a disjoint box
+    boxes = [
+        [10.3, 11.0, 35.5, 36.5],
+        [10.4, 10.8, 35.7, 36.3],
+        [11.2, 11.7, 35.6, 36.4],
+    ]
+    outputs = [str(tmp_path / "many" / f"domain{i}") for i in range(len(boxes))]
+
+    domains = create_domains(str(bathymetry), boxes, outputs)
+    for (bath, coast), box in zip(domains, boxes):
+        single_bath, single_coast = create_domain(
+            str(bathymetry), *box, str(tmp_path / "one" / bath.stem)
+        )
+        assert bath.read_bytes() == single_bath.read_bytes()
+        # create_domain takes the box edges as land, so the two coastlines
+        # may differ along them, by up to one grid cell
+        land = map_land(coast, box)
+        single_land = map_land(single_coast, box)
+        assert land.area > 0.0
+        edge_cells = 0.02 * shapely.box(box[0], box[2], box[1], box[3]).length
+        assert shapely.symmetric_difference(land, single_land).area <= edge_cells
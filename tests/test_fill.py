@@ -0,0 +1,37 @@
+import numpy as np
+import xarray as xr
+
+from osmond.fill import fill_coastal, fill_index_map
+
+
+def coastal_dataset() -> xr.Dataset:
+    """Two time steps of a 4x5 grid, land (NaN) over the three western columns."""
+    field = np.tile(np.arange(5.0, dtype=np.float32), (2, 4, 1))
+    field[1] += 10.0
+    field[:, :, :3] = np.nan
+    return xr.Dataset({"sst": (("time", "latitude", "longitude"), field)})
+
+
+def test_fill_index_map():
+    valid = np.array([[False, False, True], [False, False, False]])
+    fill_map = fill_index_map(valid, max_cells=1)
+    # direct and diagonal neighbours of the single valid cell
+    np.testing.assert_array_equal(fill_map.target, [1, 4, 5])
+    np.testing.assert_array_equal(fill_map.source, [2, 2, 2])
+
+
+def test_fill_coastal():
+    ds = coastal_dataset()
+    out = fill_coastal(ds.chunk({"time": 1}), max_cells=2).compute()
+
+    # each filled cell copies its nearest sea cell, at every time step
+    expected = np.array([np.nan, 3.0, 3.0, 3.0, 4.0])
+    np.testing.assert_array_equal(out["sst"][0], np.tile(expected, (4, 1)))
+    np.testing.assert_array_equal(out["sst"][1], np.tile(expected + 10.0, (4, 1)))
+    assert out["sst"].dtype == np.float32
+
+
+def test_fill_without_missing_cells():
+    ds = coastal_dataset().isel(longitude=slice(3, None))
+    out = fill_coastal(ds, max_cells=2)
+    xr.testing.assert_identical(out, ds)
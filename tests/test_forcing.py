@@ -0,0 +1,246 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from osmond.catalog import find_outputs
+from osmond.config import (
+    DaskExecution,
+    OutputFormat,
+    Precision,
+    ProcessOptions,
+    Scheduler,
+    data_maper,
+    meteo_dataset,
+)
+from osmond.forcing import open_mapped, process, process_boxes, process_files
+from osmond.manifest import read_manifest
+from osmond.zarr_io import zarr_to_netcdf
+
+
+def write_packed_input(path: Path):
+    """A GFS-like file with int16 data packed with float64 attributes."""
+    rng = np.random.default_rng(0)
+    lon = np.arange(0.0, 5.0, 0.25)
+    lat = np.arange(30.0, 34.0, 0.25)
+    time = np.arange(6.0)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    data_vars = {}
+    for i, dfield in enumerate(dset_map.data_vars.values()):
+        values = 1000.0 * i + rng.normal(0.0, 5.0, (time.size, lat.size, lon.size))
+        values[:, :2, :3] = np.nan
+        data_vars[dfield.name] = (("time", "latitude", "longitude"), values)
+    ds = xr.Dataset(
+        data_vars,
+        coords={
+            "time": ("time", time, {"units": "hours since 2025-01-01", "axis": "T"}),
+            "latitude": ("latitude", lat, {"units": "degrees_north", "axis": "Y"}),
+            "longitude": ("longitude", lon, {"units": "degrees_east", "axis": "X"}),
+        },
+    )
+    encoding = {
+        dfield.name: {
+            "dtype": "int16",
+            "scale_factor": 0.01,
+            "add_offset": 1000.0 * i,
+            "_FillValue": np.int16(-32767),
+        }
+        for i, dfield in enumerate(dset_map.data_vars.values())
+    }
+    ds.to_netcdf(path, encoding=encoding)
+
+
+def test_float32_decoding(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+
+    native = open_mapped(infile, dset_map)
+    single = open_mapped(infile, dset_map, Precision.float32)
+    for vname in dset_map.data_vars:
+        assert native[vname].dtype == np.float64
+        assert single[vname].dtype == np.float32
+        np.testing.assert_allclose(single[vname], native[vname], rtol=1e-6)
+
+
+def test_float32_within_one_quantum(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    box = [0.5, 4.0, 30.0, 33.0]
+
+    outputs = {}
+    for precision in Precision:
+        output = tmp_path / precision.value / "output.nc"
+        options = ProcessOptions(precision=precision)
+        process(infile, box, output, dset_map, meteo_dataset, options)
+        outputs[precision] = xr.open_dataset(
+            output, decode_times=False, mask_and_scale=False
+        )
+
+    native, single = outputs[Precision.native], outputs[Precision.float32]
+    for vname in dset_map.data_vars:
+        assert single[vname].attrs["scale_factor"].dtype == np.float32
+        np.testing.assert_allclose(
+            single[vname].attrs["scale_factor"],
+            native[vname].attrs["scale_factor"],
+            rtol=1e-5,
+        )
+        # same missing cells, and packed values at most one quantum apart
+        np.testing.assert_array_equal(single[vname] == -32768, native[vname] == -32768)
+        diff = np.abs(single[vname].astype(int) - native[vname].astype(int))
+        assert int(diff.max()) <= 1
+
+
+def test_manifest_checksum(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    output = tmp_path / "output" / "output.nc"
+    process(infile, [0.5, 4.0, 30.0, 33.0], output, dset_map, meteo_dataset)
+
+    entry = read_manifest(output.parent)["outputs"]["output.nc"]
+    assert entry["sha256"] == hashlib.sha256(output.read_bytes()).hexdigest()
+    assert entry["size"] == output.stat().st_size
+
+
+def test_process_boxes_matches_process(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    boxes = [[0.5, 2.0, 30.0, 31.5], [1.5, 4.0, 31.0, 33.0]]
+    outputs = [tmp_path / "boxes" / f"output{i}.nc" for i in range(len(boxes))]
+    options = ProcessOptions(skip_unchanged=True)
+
+    process_boxes(infile, boxes, outputs, dset_map, meteo_dataset, options)
+    for i, box in enumerate(boxes):
+        single = tmp_path / "single" / f"output{i}.nc"
+        process(infile, box, single, dset_map, meteo_dataset)
+        expected = xr.open_dataset(single, decode_times=False, mask_and_scale=False)
+        actual = xr.open_dataset(outputs[i], decode_times=False, mask_and_scale=False)
+        xr.testing.assert_identical(actual, expected)
+
+    # unchanged boxes are skipped, a new box is processed
+    outputs.append(tmp_path / "boxes" / "output2.nc")
+    boxes.append([0.0, 4.5, 30.0, 33.5])
+    ret = process_boxes(infile, boxes, outputs, dset_map, meteo_dataset, options)
+    assert ret[:2] == [None, None] and ret[2] is not None
+    assert ret[2].sizes["longitude"] == 19
+
+
+def test_zarr_output_converts_to_netcdf(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    box = [0.5, 4.0, 30.0, 33.0]
+
+    netcdf = tmp_path / "netcdf" / "output.nc"
+    process(infile, box, netcdf, dset_map, meteo_dataset, ProcessOptions())
+    options = ProcessOptions(output_format=OutputFormat.zarr)
+    process(
+        infile, box, tmp_path / "zarr" / "output.nc", dset_map, meteo_dataset, options
+    )
+    store = tmp_path / "zarr" / "output.zarr"
+    assert store.is_dir()
+
+    converted = zarr_to_netcdf(store)
+    expected = xr.open_dataset(netcdf, decode_times=False, mask_and_scale=False)
+    actual = xr.open_dataset(converted, decode_times=False, mask_and_scale=False)
+    xr.testing.assert_identical(actual, expected)
+    for vname in dset_map.data_vars:
+        for attr in ("scale_factor", "add_offset", "missing_value"):
+            assert actual[vname].attrs[attr].dtype == expected[vname].attrs[attr].dtype
+
+
+def test_catalog_lookup_and_reuse(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    outer = tmp_path / "outer" / "output.nc"
+    process(infile, [0.5, 4.0, 30.0, 33.0], outer, dset_map, meteo_dataset)
+
+    inner_box = [1.0, 3.0, 31.0, 32.5]
+    (entry,) = find_outputs(inner_box, "2025-01-01T01", "2025-01-01T04")
+    assert entry.path == outer.resolve()
+    assert (entry.category, entry.product) == ("meteo", "gfsnc_wgrib2")
+    assert entry.dlon == entry.dlat == 0.25
+    assert find_outputs(inner_box, end="2025-01-01T07") == []
+    assert find_outputs([1.0, 4.5, 31.0, 32.5]) == []
+    assert find_outputs(inner_box, category="ocean") == []
+
+    inner = tmp_path / "inner" / "output.nc"
+    reused = process(
+        infile, inner_box, inner, dset_map, meteo_dataset, ProcessOptions(reuse=True)
+    )
+    assert read_manifest(inner.parent)["outputs"]["output.nc"]["reused"] == str(
+        outer.resolve()
+    )
+    # the same grid points as processing the input, with the outer packing
+    fresh = process(infile, inner_box, tmp_path / "fresh.nc", dset_map, meteo_dataset)
+    source = xr.open_dataset(outer, decode_times=False, mask_and_scale=False)
+    for vname in dset_map.data_vars:
+        xr.testing.assert_equal(reused[vname].longitude, fresh[vname].longitude)
+        xr.testing.assert_equal(reused[vname].latitude, fresh[vname].latitude)
+        assert reused[vname].attrs == source[vname].attrs
+        xr.testing.assert_equal(reused[vname], source[vname].sel(reused[vname].coords))
+
+
+def test_unwritable_catalog(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # a file where the catalog directory should be
+    (tmp_path / "blocker").write_text("")
+    monkeypatch.setenv("OSMOND_CATALOG", str(tmp_path / "blocker" / "catalog.sqlite"))
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    output = tmp_path / "output" / "output.nc"
+
+    # the lookup and the indexing fail, the input is processed and recorded
+    options = ProcessOptions(reuse=True)
+    ds = process(
+        infile, [0.5, 4.0, 30.0, 33.0], output, dset_map, meteo_dataset, options
+    )
+    assert ds is not None and output.exists()
+    assert "reused" not in read_manifest(output.parent)["outputs"]["output.nc"]
+
+
+def test_catalog_product_name(tmp_path: Path):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    # a copy of a registry mapping, e.g. from a user registry
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2").model_copy(deep=True)
+    dset_map.data_vars["pmsl"].mulc = 1.0
+    box = [0.5, 4.0, 30.0, 33.0]
+    process(infile, box, tmp_path / "a" / "out.nc", dset_map, meteo_dataset)
+    process(
+        infile, box, tmp_path / "b" / "out.nc", dset_map, meteo_dataset, product="mygfs"
+    )
+    products = {entry.path.parent.name: entry.product for entry in find_outputs(box)}
+    assert products == {"a": None, "b": "mygfs"}
+
+
+@pytest.mark.parametrize("scheduler", [Scheduler.threads, Scheduler.processes])
+def test_dask_execution_matches_eager(tmp_path: Path, scheduler: Scheduler):
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    box = (0.5, 4.0, 30.0, 33.0)
+    options = ProcessOptions(derived=["wind10"])
+
+    eager = process_files([str(infile)], *box, str(tmp_path / "eager"), options=options)
+    execution = DaskExecution(scheduler=scheduler, time_chunk=2)
+    lazy = process_files(
+        [str(infile)],
+        *box,
+        str(tmp_path / "lazy"),
+        options=options,
+        execution=execution,
+    )
+    assert [p.relative_to(tmp_path / "lazy") for p in lazy] == [
+        p.relative_to(tmp_path / "eager") for p in eager
+    ]
+    for expected, actual in zip(eager, lazy):
+        xr.testing.assert_identical(
+            xr.open_dataset(actual, decode_times=False, mask_and_scale=False),
+            xr.open_dataset(expected, decode_times=False, mask_and_scale=False),
+        )
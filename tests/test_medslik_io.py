@@ -0,0 +1,85 @@
+import io
+from pathlib import Path
+
+import numpy as np
+
+from osmond.medslik_io import (
+    LAND_DEPTH,
+    read_bath,
+    read_bath_header,
+    read_map,
+    write_bath,
+    write_map,
+)
+
+
+def test_bath_round_trip(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    depth = rng.uniform(0.0, 9000.0, (7, 11))
+    depth[2:4, 3:6] = LAND_DEPTH
+    path = tmp_path / "domain.bath"
+    write_bath(path, depth, 10.0, 12.5, -1.0, 0.5, "Bathymetry of test")
+
+    header = read_bath_header(path)
+    assert header.nlon == 11 and header.nlat == 7
+    assert header.title == "Bathymetry of test"
+
+    bathy = read_bath(path)
+    np.testing.assert_array_equal(bathy.depth, np.rint(depth))
+    np.testing.assert_allclose(bathy.lon, np.linspace(10.0, 12.5, 11))
+    np.testing.assert_allclose(bathy.lat, np.linspace(-1.0, 0.5, 7))
+
+
+def test_bath_matches_savetxt(tmp_path: Path):
+    rng = np.random.default_rng(1)
+    depth = np.round(rng.uniform(0.0, 9000.0, (5, 9)), 1)
+    depth[0, 0] = 0.5
+    depth[-1, -1] = LAND_DEPTH
+    path = tmp_path / "domain.bath"
+    write_bath(path, depth, 0.0, 1.0, 0.0, 1.0)
+
+    expected = io.StringIO()
+    np.savetxt(expected, np.flip(depth, axis=0), fmt="%5.0f", delimiter="")
+    body = path.read_text().split("\n", 3)[3]
+    assert body == expected.getvalue()
+
+
+def test_bath_negative_zero_matches_savetxt(tmp_path: Path):
+    depth = np.array([[-0.4, 3.0], [-0.0, 0.4]])
+    path = tmp_path / "domain.bath"
+    write_bath(path, depth, 0.0, 1.0, 0.0, 1.0)
+
+    expected = io.StringIO()
+    np.savetxt(expected, np.flip(depth, axis=0), fmt="%5.0f", delimiter="")
+    body = path.read_text().split("\n", 3)[3]
+    assert body == expected.getvalue() == "   -0    0\n   -0    3\n"
+
+
+def test_bath_round_trip_out_of_fixed_range(tmp_path: Path):
+    depth = np.array([[1.0, -3.0], [12345.0, 4.0]])
+    path = tmp_path / "domain.bath"
+    write_bath(path, depth, 0.0, 1.0, 0.0, 1.0)
+    np.testing.assert_array_equal(read_bath(path).depth, depth)
+
+
+def test_map_round_trip(tmp_path: Path):
+    square = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]])
+    triangle = np.array([[-10.5, 35.25], [-10.0, 36.0], [-9.75, 35.5], [-10.5, 35.25]])
+    path = tmp_path / "domain.map"
+    write_map(path, [square, triangle])
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == "2"
+    assert lines[1] == "5  0"
+    assert lines[8] == f"{-10.5:10.5f} {35.25:10.5f}"
+
+    polygons = read_map(path)
+    assert len(polygons) == 2
+    np.testing.assert_allclose(polygons[0], square)
+    np.testing.assert_allclose(polygons[1], triangle)
+
+
+def test_map_empty(tmp_path: Path):
+    path = tmp_path / "domain.map"
+    write_map(path, [])
+    assert read_map(path) == []
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import numpy as np
+
+from osmond.medslik_io import LAND_DEPTH, write_bath, write_map
+from osmond.quicklook import (
+    bathymetry_pyramid,
+    halve,
+    pyramid_level,
+    quicklook,
+    read_pyramid,
+    write_pyramid,
+)
+
+
+def test_halve_blocks():
+    depth = np.array(
+        [
+            [10.0, 20.0, np.nan, 5.0, 7.0],
+            [30.0, 40.0, np.nan, np.nan, 9.0],
+            [1.0, np.nan, 2.0, 4.0, np.nan],
+        ],
+        dtype=np.float32,
+    )
+    # odd edges are paired with a copy of the last row/column
+    expected = [[25.0, np.nan, 8.0], [1.0, 3.0, np.nan]]
+    np.testing.assert_array_equal(halve(depth), np.array(expected, np.float32))
+
+
+def test_pyramid_levels(tmp_path: Path):
+    depth = np.full((300, 520), 100.0)
+    depth[:, :40] = LAND_DEPTH
+    levels = bathymetry_pyramid(depth, min_size=128)
+    assert {f: lvl.shape for f, lvl in levels.items()} == {
+        2: (150, 260),
+        4: (75, 130),
+        8: (38, 65),
+    }
+    assert np.isnan(levels[8][:, :5]).all() and (levels[8][:, 5:] == 100.0).all()
+
+    assert pyramid_level(levels, 100, 60) == 4
+    assert pyramid_level(levels, 60, 30) == 8
+    assert pyramid_level(levels, 400, 200) == 1
+
+    path = tmp_path / "domain.pyramid.npz"
+    write_pyramid(path, depth, 10.0, 15.19, 30.0, 32.99)
+    header, read = read_pyramid(path)
+    assert (header.nlon, header.nlat, header.lon2) == (520, 300, 15.19)
+    for factor, level in levels.items():
+        np.testing.assert_array_equal(read[factor], level)
+
+
+def test_quicklook(tmp_path: Path):
+    depth = np.random.default_rng(0).uniform(0.0, 500.0, (400, 600))
+    depth[:50, :50] = LAND_DEPTH
+    domain = tmp_path / "domain"
+    write_bath(domain.with_suffix(".bath"), depth, 10.0, 15.99, 30.0, 33.99)
+    square = np.array([[10.0, 30.0], [10.5, 30.0], [10.5, 30.5], [10.0, 30.5]])
+    write_map(domain.with_suffix(".map"), [square, square + 1.0])
+
+    # without and with a pyramid file
+    assert quicklook(domain, width=400) == domain.with_suffix(".png")
+    write_pyramid(domain.with_suffix(".pyramid.npz"), depth, 10.0, 15.99, 30.0, 33.99)
+    output = quicklook(domain, tmp_path / "preview.png", width=400)
+    assert output.read_bytes().startswith(b"\x89PNG")
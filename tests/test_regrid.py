@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from osmond import regrid
+from osmond.config import TargetGrid
+from osmond.regrid import get_weights, regrid_dataset
+
+
+@pytest.fixture(autouse=True)
+def clear_weights():
+    regrid._weights.clear()
+
+
+def plane_dataset(lon: np.ndarray, lat: np.ndarray) -> xr.Dataset:
+    """A field linear in lon/lat, reproduced exactly by bilinear interpolation."""
+    field = 2.0 * lon[None, :] + 3.0 * lat[:, None]
+    return xr.Dataset(
+        {"sst": (("time", "latitude", "longitude"), field[None].astype(np.float32))},
+        coords={"latitude": lat, "longitude": lon},
+    )
+
+
+def test_regrid_plane(osmond_cache: Path):
+    ds = plane_dataset(np.arange(10.0, 15.0), np.arange(30.0, 34.0))
+    grid = TargetGrid(lon1=10.5, lon2=13.5, lat1=30.25, lat2=32.75, nlon=7, nlat=6)
+    out = regrid_dataset(ds.chunk({"time": 1}), grid).compute()
+
+    lon = np.linspace(10.5, 13.5, 7)
+    lat = np.linspace(30.25, 32.75, 6)
+    np.testing.assert_allclose(out["longitude"], lon)
+    np.testing.assert_allclose(out["latitude"], lat)
+    expected = 2.0 * lon[None, :] + 3.0 * lat[:, None]
+    np.testing.assert_allclose(out["sst"][0], expected, rtol=1e-6)
+    assert out["sst"].dtype == np.float32
+    assert len(list(osmond_cache.glob("regrid-*.npz"))) == 1
+
+
+def test_regrid_across_date_line():
+    # source in 0..360 longitudes, target in -180..180
+    ds = plane_dataset(np.array([358.0, 359.0, 0.0, 1.0, 2.0]), np.arange(3.0))
+    grid = TargetGrid(lon1=-1.5, lon2=0.5, lat1=0.5, lat2=1.5, nlon=3, nlat=2)
+    out = regrid_dataset(ds, grid)
+    # the source field jumps at 0, so only its value at 359.5 is checked
+    np.testing.assert_allclose(
+        out["sst"][0, :, 0], 2.0 * 358.5 + 3.0 * np.array([0.5, 1.5])
+    )
+
+
+def test_missing_points_renormalised():
+    ds = plane_dataset(np.arange(2.0), np.arange(2.0))
+    ds["sst"][0, 0, 0] = np.nan
+    grid = TargetGrid(lon1=0.5, lon2=0.5, lat1=0.5, lat2=0.5, nlon=1, nlat=1)
+    out = regrid_dataset(ds, grid)
+    np.testing.assert_allclose(out["sst"][0, 0, 0], (2.0 + 3.0 + 5.0) / 3, rtol=1e-6)
+
+    ds["sst"][:] = np.nan
+    assert np.isnan(regrid_dataset(ds, grid)["sst"]).all()
+
+
+def test_weights_without_writable_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # a file where the cache directory should be: the cache cannot be written
+    blocker = tmp_path / "cache"
+    blocker.write_text("")
+    monkeypatch.setenv("OSMOND_CACHE_DIR", str(blocker / "osmond"))
+    grid = TargetGrid(lon1=0.0, lon2=1.0, lat1=0.0, lat2=1.0, nlon=3, nlat=3)
+    weights = get_weights(np.arange(3.0), np.arange(3.0), grid)
+    np.testing.assert_allclose(weights.weight.sum(axis=1), 1.0)
+
+
+def test_corrupt_weights_cache_rebuilt(osmond_cache: Path):
+    grid = TargetGrid(lon1=0.0, lon2=1.0, lat1=0.0, lat2=1.0, nlon=3, nlat=3)
+    expected = get_weights(np.arange(3.0), np.arange(3.0), grid)
+    (cached,) = osmond_cache.glob("regrid-*.npz")
+    cached.write_bytes(b"not a zip file")
+
+    regrid._weights.clear()
+    weights = get_weights(np.arange(3.0), np.arange(3.0), grid)
+    np.testing.assert_array_equal(weights.points, expected.points)
+    np.testing.assert_array_equal(weights.weight, expected.weight)
+    # the rebuilt weights replace the corrupt file
+    with np.load(cached) as npz:
+        np.testing.assert_array_equal(npz["points"], expected.points)
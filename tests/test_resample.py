@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from osmond.config import ResampleMethod, TimeResample
+from osmond.forcing import resample_time
+
+
+def hourly_dataset(nsteps: int) -> xr.Dataset:
+    """Undecoded hourly time axis, with a field equal to the hour."""
+    hours = np.arange(nsteps, dtype=np.float64)
+    field = np.broadcast_to(hours[:, None], (nsteps, 2)).astype(np.float32)
+    time = ("time", hours, {"units": "hours since 2025-01-01"})
+    return xr.Dataset({"sst": (("time", "x"), field)}, coords={"time": time})
+
+
+def test_decimate():
+    out = resample_time(hourly_dataset(7), TimeResample(interval=3, method="decimate"))
+    np.testing.assert_array_equal(out["time"], [0.0, 3.0, 6.0])
+    np.testing.assert_array_equal(out["sst"][:, 0], [0.0, 3.0, 6.0])
+
+
+def test_decimate_interval_not_multiple():
+    ds = hourly_dataset(13).isel(time=slice(None, None, 3))
+    # 3-hourly input: 2-hourly steps other than 0, 6 and 12 cannot be kept
+    with pytest.raises(ValueError, match="step dividing 2 hours"):
+        resample_time(ds, TimeResample(interval=2, method="decimate"))
+
+
+def test_block_mean():
+    out = resample_time(hourly_dataset(7), TimeResample(interval=3, method="mean"))
+    # blocks are labelled at their centre; the incomplete last block is dropped
+    np.testing.assert_array_equal(out["time"], [1.0, 4.0])
+    np.testing.assert_array_equal(out["sst"][:, 0], [1.0, 4.0])
+    assert out["sst"].attrs["cell_methods"] == "time: mean (interval: 3 hours)"
+
+
+def test_block_mean_irregular():
+    ds = hourly_dataset(4).assign_coords(time=[0.0, 1.0, 3.0, 4.0])
+    ds["time"].attrs["units"] = "hours since 2025-01-01"
+    with pytest.raises(ValueError, match="regular time axis"):
+        resample_time(ds, TimeResample(interval=2, method="mean"))
+
+
+def test_linear():
+    ds = hourly_dataset(4).isel(time=[0, 3])
+    out = resample_time(ds, TimeResample(interval=1.5, method="linear"))
+    np.testing.assert_allclose(out["time"], [0.0, 1.5, 3.0])
+    np.testing.assert_allclose(out["sst"][:, 1], [0.0, 1.5, 3.0])
+    assert out["time"].attrs["units"] == "hours since 2025-01-01"
+
+
+@pytest.mark.parametrize("method", list(ResampleMethod))
+def test_single_step(method: ResampleMethod):
+    ds = hourly_dataset(1)
+    out = resample_time(ds, TimeResample(interval=3, method=method))
+    xr.testing.assert_identical(out, ds)
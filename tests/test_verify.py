@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from osmond.config import OutputFormat, ProcessOptions, data_maper, meteo_dataset
+from osmond.forcing import output_path, process
+from osmond.verify import verify_file, verify_outputs
+
+from .test_forcing import write_packed_input
+
+
+def write_output(tmp_path: Path, options: ProcessOptions | None = None) -> Path:
+    options = options or ProcessOptions()
+    infile = tmp_path / "input.nc"
+    write_packed_input(infile)
+    output = tmp_path / "output" / "meteo.nc"
+    dset_map = data_maper.get("meteo", "gfsnc_wgrib2")
+    process(infile, [0.5, 4.0, 30.0, 33.0], output, dset_map, meteo_dataset, options)
+    return output_path(output, options.output_format)
+
+
+def test_verify_file(tmp_path: Path):
+    output = write_output(tmp_path)
+    report = verify_file(output, stride=2)
+    assert report["ok"], report["errors"]
+    assert report["time"]["ntimes"] == 6
+    assert report["time"]["start"] == "2025-01-01T00:00:00"
+    assert set(report["variables"]) == set(
+        data_maper.get("meteo", "gfsnc_wgrib2").data_vars
+    )
+
+    report = verify_file(output, end="2025-01-02T00:00:00")
+    assert report["errors"] == ["time ends before 2025-01-02T00:00:00"]
+
+
+def test_verify_zarr_store(tmp_path: Path):
+    store = write_output(tmp_path, ProcessOptions(output_format=OutputFormat.zarr))
+    assert store.suffix == ".zarr"
+    (tmp_path / "netcdf").mkdir()
+    netcdf = write_output(tmp_path / "netcdf")
+
+    report = verify_outputs([tmp_path / "output"])
+    assert report["ok"] and report["failed"] == []
+    assert [r["path"] for r in report["files"]] == [str(store)]
+    expected = verify_file(netcdf)
+    assert report["files"][0]["variables"] == expected["variables"]
+    assert report["files"][0]["time"] == expected["time"]
+
+
+def test_verify_outputs(tmp_path: Path):
+    output = write_output(tmp_path)
+    (output.parent / "broken.nc").write_bytes(b"not netcdf")
+
+    report = verify_outputs([output.parent], max_workers=1)
+    assert report["nfiles"] == 2 and not report["ok"]
+    assert report["failed"] == [str(output.parent / "broken.nc")]
+
+    assert verify_outputs([output])["ok"]
+    # no files to check is not a pass
+    (tmp_path / "empty").mkdir()
+    empty = verify_outputs([tmp_path / "empty"])
+    assert empty["nfiles"] == 0 and not empty["ok"]